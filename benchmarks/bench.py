@@ -0,0 +1,369 @@
+# benchmarks/bench.py
+"""
+Benchmark suite for the engine and the bots.
+
+    python -m benchmarks.bench run --out bench.json
+    python -m benchmarks.bench compare baseline.json bench.json
+    python -m benchmarks.bench sparse --out sparse.json
+
+Every benchmark runs on the same seeded positions, so results from two runs
+are directly comparable. Each metric records whether lower (times, errors)
+or higher (agreement, speedup) is better; compare flags any metric that got
+worse by more than the threshold.
+
+Timings only compare on the same machine, so no baseline is checked in:
+record one with `run --out baseline.json` on the commit to compare against
+(e.g. before a change), then `run` again afterwards and compare the two.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from ur.game import UrGame
+from ur.rules import get_rules
+
+
+# ---------------------------
+# Fixed positions
+# ---------------------------
+
+class _RandomPolicy:
+    def choose(self, game, roll):
+        moves = game.legal_moves(roll)
+        return random.choice(moves) if moves else None
+
+
+def make_positions(n, seed=0, every=7, rules=None):
+    """
+    n (game, roll) decision points, sampled every `every` plies from seeded
+    random-play games, so they cover opening, middle game and endgame.
+    """
+    rng_state = random.getstate()
+    random.seed(seed)
+    positions = []
+    policy = _RandomPolicy()
+    ply = 0
+    game = UrGame(rules)
+    while len(positions) < n:
+        if game.winner is not None:
+            game = UrGame(rules)
+        roll = game.roll_dice()
+        moves = game.legal_moves(roll)
+        if not moves:
+            game.turn = 1 - game.turn
+            continue
+        ply += 1
+        if ply % every == 0:
+            positions.append((game.clone(), roll))
+        game.play_move(policy.choose(game, roll), roll)
+    random.setstate(rng_state)
+    return positions
+
+
+# ---------------------------
+# Timing helpers
+# ---------------------------
+
+def best_of(fn, repeat):
+    """Minimum wall time of fn() over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def metric(value, unit, better="lower", **extra):
+    return {"value": value, "unit": unit, "better": better, **extra}
+
+
+# ---------------------------
+# Engine benchmarks
+# ---------------------------
+
+def bench_engine(positions, repeat):
+    results = {}
+    n = len(positions)
+
+    def legal():
+        for g, r in positions:
+            g.legal_moves(r)
+    results["engine.legal_moves"] = metric(best_of(legal, repeat) / n * 1e6, "us/call")
+
+    def clone():
+        for g, _ in positions:
+            g.clone()
+    results["engine.clone"] = metric(best_of(clone, repeat) / n * 1e6, "us/call")
+
+    # play_move mutates, so every repeat gets fresh (untimed) copies
+    moves = [(g, r, g.legal_moves(r)[0]) for g, r in positions]
+    best = float("inf")
+    for _ in range(repeat):
+        work = [(g.clone(), r, m) for g, r, m in moves]
+        t0 = time.perf_counter()
+        for g, r, m in work:
+            g.play_move(m, r)
+        best = min(best, time.perf_counter() - t0)
+    results["engine.play_move"] = metric(best / n * 1e6, "us/call")
+
+    game = positions[0][0].clone()
+    calls = 10000
+
+    def roll():
+        for _ in range(calls):
+            game.roll_dice()
+    random.seed(0)
+    results["engine.roll_dice"] = metric(best_of(roll, repeat) / calls * 1e6, "us/call")
+    return results
+
+
+def bench_games(n_games, seed=0, rules=None):
+    """Full random-vs-random games, the raw simulation throughput."""
+    random.seed(seed)
+    policy = _RandomPolicy()
+    plies = 0
+    t0 = time.perf_counter()
+    for _ in range(n_games):
+        game = UrGame(rules)
+        while game.winner is None:
+            roll = game.roll_dice()
+            plies += 1
+            choice = policy.choose(game, roll)
+            if choice is None:
+                game.turn = 1 - game.turn
+                continue
+            game.play_move(choice, roll)
+    dt = time.perf_counter() - t0
+    return {
+        "game.simulate": metric(dt / n_games * 1e3, "ms/game",
+                                games_per_sec=n_games / dt, plies_per_game=plies / n_games),
+    }
+
+
+# ---------------------------
+# Bot benchmarks
+# ---------------------------
+
+def bench_bots(positions, names=None):
+    """
+    choose() latency of every bot on the same positions. Each bot starts
+    from an empty shared eval cache and without an opening book, so its time
+    does not depend on the bots timed before it or on book coverage.
+    """
+    from bots.utils import SHARED_EVAL_CACHE
+    from evaluate import load_bots, make_bot
+
+    bot_classes = load_bots()
+    results = {}
+    for name in sorted(bot_classes):
+        if names and name not in names:
+            continue
+        bot = make_bot(bot_classes[name])
+        SHARED_EVAL_CACHE.clear()
+        if hasattr(bot, "book"):
+            bot.book = None
+        random.seed(0)
+        times = []
+        for g, r in positions:
+            g2 = g.clone()
+            t0 = time.perf_counter()
+            bot.choose(g2, r)
+            times.append(time.perf_counter() - t0)
+        times.sort()
+        results[f"bot.{name}.choose"] = metric(
+            sum(times) / len(times) * 1e3, "ms/call",
+            p50=times[len(times) // 2] * 1e3, max=times[-1] * 1e3,
+        )
+    return results
+
+
+# ---------------------------
+# Sparse search error
+# ---------------------------
+
+def bench_sparse(positions, budget, max_replies):
+    """
+    Error of sparse Expectimax2Bot against full expectimax on the same
+    positions. loss is how much full-search value the sparse choice gives
+    up (0 when it picks a best move); value_error is the gap between the
+    sparse and full estimates of the root value.
+    """
+    import math
+    from bots.a_expectimax2 import Expectimax2Bot
+
+    full = Expectimax2Bot(book=None)
+    sparse = Expectimax2Bot(book=None, budget=budget, max_replies=max_replies)
+
+    losses, value_errors = [], []
+    t_full = t_sparse = 0.0
+    for g, r in positions:
+        if len(g.legal_moves(r)) < 2:
+            continue
+        t0 = time.perf_counter()
+        values = dict(full.move_values(g.clone(), r))
+        t_full += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        sparse_values = sparse.move_values(g.clone(), r)
+        t_sparse += time.perf_counter() - t0
+
+        choice, sparse_best = max(sparse_values, key=lambda mv: mv[1])
+        best = max(values.values())
+        losses.append(best - values[choice])
+        value_errors.append(abs(sparse_best - best))
+
+    n = len(losses)
+    if not n:
+        return {}
+    mean = sum(losses) / n
+    sd = math.sqrt(sum((x - mean) ** 2 for x in losses) / max(n - 1, 1))
+    ordered = sorted(losses)
+    return {
+        "sparse.loss": metric(mean, "eval", p95=ordered[int(0.95 * (n - 1))], max=ordered[-1],
+                              upper95=mean + 1.96 * sd / math.sqrt(n)),
+        "sparse.agreement": metric(sum(x <= 1e-9 for x in losses) / n, "fraction",
+                                   better="higher"),
+        "sparse.value_error": metric(sum(value_errors) / n, "eval", max=max(value_errors)),
+        "sparse.speedup": metric(t_full / t_sparse, "x", better="higher", positions=n),
+    }
+
+
+def run_sparse(args):
+    rules = get_rules(args.rules)
+    positions = make_positions(args.positions, seed=args.seed, every=args.every, rules=rules)
+    results = bench_sparse(positions, args.budget, args.max_replies)
+    for key, m in results.items():
+        extra = " ".join(f"{k}={v:.3f}" for k, v in m.items()
+                         if k not in ("value", "unit", "better"))
+        print(f"{key:24s} {m['value']:10.3f} {m['unit']:8s} {extra}")
+    if args.out:
+        report = {"meta": {"seed": args.seed, "rules": args.rules, "budget": args.budget,
+                           "max_replies": args.max_replies}, "results": results}
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+        print("Saved", args.out)
+    return results
+
+
+def run(args):
+    rules = get_rules(args.rules)
+    positions = make_positions(args.positions, seed=args.seed, rules=rules)
+    results = {}
+    results.update(bench_engine(positions, args.repeat))
+    results.update(bench_games(args.games, seed=args.seed, rules=rules))
+    if not args.no_bots:
+        names = set(args.bots.split(",")) if args.bots else None
+        results.update(bench_bots(positions[:args.bot_positions], names))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "seed": args.seed,
+            "rules": args.rules,
+            "positions": args.positions,
+            "bot_positions": args.bot_positions,
+        },
+        "results": results,
+    }
+
+    for key, m in results.items():
+        print(f"{key:40s} {m['value']:12.3f} {m['unit']}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+        print("Saved", args.out)
+    return report
+
+
+# ---------------------------
+# Regression check
+# ---------------------------
+
+def compare(baseline, current, threshold):
+    """
+    Return [(key, base, cur, ratio)] for metrics that got worse by more than
+    threshold: above 1 + threshold for lower-is-better metrics, below
+    1 - threshold for higher-is-better ones (results saved before metrics
+    recorded a direction count as lower-is-better).
+    """
+    regressions = []
+    for key, cur in sorted(current["results"].items()):
+        base = baseline["results"].get(key)
+        if base is None or base["value"] <= 0:
+            print(f"{key:40s} {'new':>10s}")
+            continue
+        ratio = cur["value"] / base["value"]
+        if cur.get("better", "lower") == "higher":
+            worse, improved = ratio < 1 - threshold, ratio > 1 + threshold
+        else:
+            worse, improved = ratio > 1 + threshold, ratio < 1 - threshold
+        flag = ""
+        if worse:
+            flag = "  REGRESSION"
+            regressions.append((key, base["value"], cur["value"], ratio))
+        elif improved:
+            flag = "  better"
+        print(f"{key:40s} {base['value']:10.3f} -> {cur['value']:10.3f} {cur['unit']:8s} x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engine and bot benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmarks")
+    p_run.add_argument("--out", help="write JSON results here")
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--rules", default="default", help="ur.rules variant")
+    p_run.add_argument("--positions", type=int, default=200)
+    p_run.add_argument("--bot-positions", type=int, default=12)
+    p_run.add_argument("--repeat", type=int, default=5)
+    p_run.add_argument("--games", type=int, default=20)
+    p_run.add_argument("--bots", help="comma-separated subset of bots")
+    p_run.add_argument("--no-bots", action="store_true")
+
+    p_cmp = sub.add_parser("compare", help="compare two result files")
+    p_cmp.add_argument("baseline", help="results recorded with `run --out` before the change")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.10,
+                       help="relative change for the worse that counts as a regression")
+
+    p_sparse = sub.add_parser("sparse", help="error of sparse vs full Expectimax2Bot search")
+    p_sparse.add_argument("--out", help="write JSON results here")
+    p_sparse.add_argument("--seed", type=int, default=0)
+    p_sparse.add_argument("--rules", default="default", help="ur.rules variant")
+    p_sparse.add_argument("--positions", type=int, default=20)
+    p_sparse.add_argument("--every", type=int, default=37, help="plies between sampled positions")
+    p_sparse.add_argument("--budget", type=int, default=20_000)
+    p_sparse.add_argument("--max-replies", type=int, default=4)
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "run":
+        run(args)
+        return 0
+    if args.cmd == "sparse":
+        run_sparse(args)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# benchmarks/fuzz_engine.py
+"""
+Differential fuzzing of ur.fast.FastGame against ur.game.UrGame.
+
+    python -m benchmarks.fuzz_engine --games 1000000 --workers 8
+
+Each seeded random game is played in both engines in lockstep: the dice
+must agree draw for draw, and after every ply the legal moves, positions,
+turn, winner and canonical key must be identical. Every rules variant is
+covered in turn. Clones are checked along the way, since the bots search
+on them. Afterwards the same games are replayed in each engine alone to
+report the speedup factor. Exits non-zero on the first mismatch, printing
+the seed and ply so it can be replayed.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+from ur.game import UrGame
+from ur.fast import FastGame
+from ur.rules import VARIANTS, get_rules
+
+
+def state(game):
+    return game.pos, game.turn, game.winner, game.canonical_key()
+
+
+def check_game(seed, rules):
+    """Play one lockstep game; return None, or a description of the first mismatch."""
+    random.seed(seed)
+    ref = UrGame(rules)
+    fast = FastGame(rules)
+    ply = 0
+    while ref.winner is None:
+        rng = random.getstate()
+        roll = ref.roll_dice()
+        random.setstate(rng)
+        if fast.roll_dice() != roll:
+            return f"seed {seed} ply {ply}: dice differ"
+
+        moves = ref.legal_moves(roll)
+        if fast.legal_moves(roll) != moves:
+            return f"seed {seed} ply {ply}: legal moves {fast.legal_moves(roll)} != {moves} ({ref!r}, roll {roll})"
+
+        if not moves:
+            ref.turn = fast.turn = 1 - ref.turn
+        else:
+            move = random.choice(moves)
+            if ply % 17 == 0:
+                # a clone must behave like the original
+                fast = fast.clone()
+            ref.play_move(move, roll)
+            fast.play_move(move, roll)
+        if state(fast) != state(ref):
+            return f"seed {seed} ply {ply}: state {fast!r} != {ref!r}"
+        ply += 1
+    return None
+
+
+def check_range(task):
+    """Worker: check games [first, first + n) cycling through the variants."""
+    first, n, variants = task
+    for g in range(first, first + n):
+        error = check_game(g, get_rules(variants[g % len(variants)]))
+        if error is not None:
+            return n, error
+    return n, None
+
+
+def play_random(engine, seeds, rules):
+    """Random-policy games with one engine; returns total plies."""
+    plies = 0
+    for seed in seeds:
+        random.seed(seed)
+        game = engine(rules)
+        while game.winner is None:
+            roll = game.roll_dice()
+            moves = game.legal_moves(roll)
+            plies += 1
+            if not moves:
+                game.turn = 1 - game.turn
+                continue
+            game.play_move(random.choice(moves), roll)
+    return plies
+
+
+def speedup(games, rules, repeat=3):
+    seeds = range(games)
+    times = {}
+    for engine in (UrGame, FastGame):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            play_random(engine, seeds, rules)
+            best = min(best, time.perf_counter() - t0)
+        times[engine.__name__] = best
+    return times["UrGame"] / times["FastGame"], times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential fuzzing of FastGame against UrGame")
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0, help="first game seed")
+    parser.add_argument("--rules", help="one variant (default: cycle through all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=500, help="games per worker task")
+    parser.add_argument("--bench-games", type=int, default=20,
+                        help="games per engine for the speedup measurement (0 to skip)")
+    args = parser.parse_args(argv)
+
+    variants = [args.rules] if args.rules else sorted(VARIANTS)
+    tasks = [(first, min(args.chunk, args.seed + args.games - first), variants)
+             for first in range(args.seed, args.seed + args.games, args.chunk)]
+
+    t0 = time.perf_counter()
+    checked = 0
+    with Pool(args.workers) as pool:
+        for n, error in pool.imap_unordered(check_range, tasks):
+            if error is not None:
+                pool.terminate()
+                print("MISMATCH", error)
+                return 1
+            checked += n
+            print(f"\r{checked}/{args.games} games identical ({time.perf_counter() - t0:.0f}s)",
+                  end="", flush=True)
+    print()
+
+    if args.bench_games:
+        for name in variants:
+            factor, times = speedup(args.bench_games, get_rules(name))
+            print(f"{name:22s} UrGame {times['UrGame']:.3f}s  FastGame {times['FastGame']:.3f}s  "
+                  f"speedup x{factor:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
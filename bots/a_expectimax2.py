@@ -1,26 +1,100 @@
 # bots/expectimax2_bot.py
 import math
 
-DICE_PROBS = {
-    0: 1/16,
-    1: 4/16,
-    2: 6/16,
-    3: 4/16,
-    4: 1/16,
-}
-
-class Expectimax2Bot:
+from ur.book import OpeningBook
+from bots.utils import DICE_PROBS, ExpectimaxBase, distinct_moves
+
+# default for Expectimax2Bot(book=...): the shared opening book; None turns it off
+_SHARED = object()
+
+# rolls 0 and 4 (1/16 each) dropped and the rest renormalised
+SPARSE_PROBS = {r: p / (14/16) for r, p in DICE_PROBS.items() if r in (1, 2, 3)}
+
+
+def move_gain(game, piece, roll, weights):
+    """
+    Change in eval_position (for the player to move) from moving `piece`,
+    worked out from the rules tables without playing the move. Used to
+    order and prune replies in sparse search.
+    """
+    w_progress, w_finished, w_rosette = weights
+    p = game.turn
+    rules = game.rules
+    final = rules.final_step
+    pos = game.pos[p][piece]
+    new = pos + roll
+
+    gain = w_progress * (new - max(pos, 0))
+    if pos >= 0 and rules.rosette_steps[p][pos]:
+        gain -= w_rosette
+    if new == final:
+        return gain + w_finished
+    if rules.rosette_steps[p][new]:
+        gain += w_rosette
+    opp_step = rules.opp_steps[p][new]
+    if opp_step is not None and not rules.safe_steps[p][new] and opp_step in game.pos[1 - p]:
+        gain += w_progress * opp_step
+        if rules.rosette_steps[1 - p][opp_step]:
+            gain += w_rosette
+    return gain
+
+
+class Expectimax2Bot(ExpectimaxBase):
     """
     2-ply expectimax:
     - our move
     - opponent expected move
     - our expected response
+
+    Books, races, weights and the eval cache work as in
+    bots.utils.ExpectimaxBase. Positions in the opening book
+    (trained/opening_book.bin, if present) are answered without searching;
+    pass book=None to always search.
+
+    Sparse mode (either option set) trades exactness for speed on large
+    boards: max_replies keeps only the opponent replies with the best
+    move_gain (duplicate moves of interchangeable pieces are merged
+    first), and budget caps the estimated leaf count of one choose() by
+    dropping rolls 0 and 4 at chance nodes (our reply level first, then
+    the opponent's). See `benchmarks.bench sparse` for the error this costs.
     """
 
+    budget = None
+    max_replies = None
+
+    # chance distributions for the two levels; choose() narrows them in sparse mode
+    _opp_probs = DICE_PROBS
+    _self_probs = DICE_PROBS
+
+    def __init__(self, book=_SHARED, cache=None, weights=None, budget=None, max_replies=None,
+                 race=False):
+        super().__init__(cache, weights, race)
+        if budget is not None:
+            self.budget = budget
+        if max_replies is not None:
+            self.max_replies = max_replies
+        if book is _SHARED:
+            # the shared book was built with the default weights
+            book = OpeningBook.shared() if self.tuned else None
+        self.book = book
+
     def choose(self, game, roll):
+        st = self.stats
+        self.use_rules(game.rules)
+        move = self.shortcut(game, roll)
+        if move is not None:
+            return move
+        if st is not None:
+            st.begin()
+            st.legal_calls += 1
+
         moves = game.legal_moves(roll)
         if not moves:
             return None
+        if self.sparse:
+            moves = distinct_moves(game, moves)
+        if self.budget is not None:
+            self.plan(game, len(moves))
 
         best_val = -math.inf
         best_move = None
@@ -28,78 +102,125 @@ class Expectimax2Bot:
         for m in moves:
             g2 = game.clone()
             g2.play_move(m, roll)
+            if st is not None:
+                st.clones += 1
+                st.nodes[1] += 1
 
             val = self.expect_opp(g2)
             if val > best_val:
                 best_val = val
                 best_move = m
 
+        if st is not None:
+            st.end(3)
         return best_move
 
+    @property
+    def sparse(self):
+        return self.budget is not None or self.max_replies is not None
+
+    def move_values(self, game, roll):
+        """[(move, expected value)] for every legal move, as choose() scores them."""
+        self.use_rules(game.rules)
+        moves = game.legal_moves(roll)
+        if self.sparse:
+            moves = distinct_moves(game, moves)
+        if moves and self.budget is not None:
+            self.plan(game, len(moves))
+        out = []
+        for m in moves:
+            g2 = game.clone()
+            g2.play_move(m, roll)
+            out.append((m, self.expect_opp(g2)))
+        return out
+
+    def plan(self, game, n_moves):
+        """
+        Pick the chance distributions for this search so that the estimated
+        number of leaf evaluations stays within budget. The branching at the
+        two lower levels is estimated from this position with a middle roll.
+        """
+        g = game.clone()
+        opp_branch = len(distinct_moves(g, g.legal_moves(2)))
+        g.turn ^= 1
+        self_branch = len(distinct_moves(g, g.legal_moves(2)))
+        if self.max_replies is not None:
+            opp_branch = min(opp_branch, self.max_replies)
+
+        def cost(opp_rolls, self_rolls):
+            return n_moves * opp_rolls * max(opp_branch, 1) * self_rolls * max(self_branch, 1)
+
+        self._opp_probs = self._self_probs = DICE_PROBS
+        if cost(5, 5) > self.budget:
+            self._self_probs = SPARSE_PROBS
+            if cost(5, 3) > self.budget:
+                self._opp_probs = SPARSE_PROBS
+
     def expect_opp(self, game):
+        st = self.stats
         val = 0.0
-        for r, p in DICE_PROBS.items():
+        for r, p in self._opp_probs.items():
             g2 = game.clone()
             moves = g2.legal_moves(r)
+            if st is not None:
+                st.clones += 1
+                st.legal_calls += 1
+            if self.sparse:
+                moves = distinct_moves(g2, moves)
+            if self.max_replies is not None and len(moves) > self.max_replies:
+                weights = self.weights
+                moves.sort(key=lambda m: move_gain(g2, m, r, weights), reverse=True)
+                del moves[self.max_replies:]
 
             if not moves:
                 g2.turn ^= 1
+                if st is not None:
+                    st.nodes[2] += 1
                 val += p * self.expect_self(g2)
             else:
                 worst = math.inf
                 for m in moves:
                     g3 = g2.clone()
                     g3.play_move(m, r)
+                    if st is not None:
+                        st.clones += 1
+                        st.nodes[2] += 1
                     worst = min(worst, self.expect_self(g3))
                 val += p * worst
         return val
 
     def expect_self(self, game):
+        st = self.stats
         val = 0.0
-        for r, p in DICE_PROBS.items():
+        for r, p in self._self_probs.items():
             g2 = game.clone()
             moves = g2.legal_moves(r)
+            if st is not None:
+                st.clones += 1
+                st.legal_calls += 1
+            if self.sparse:
+                moves = distinct_moves(g2, moves)
 
             if not moves:
                 g2.turn ^= 1
+                if st is not None:
+                    st.nodes[3] += 1
                 val += p * self.eval(g2)
             else:
                 best = -math.inf
                 for m in moves:
                     g3 = g2.clone()
                     g3.play_move(m, r)
+                    if st is not None:
+                        st.clones += 1
+                        st.nodes[3] += 1
                     best = max(best, self.eval(g3))
                 val += p * best
         return val
 
-    def eval(self, game):
-        me = game.turn
-        opp = me ^ 1
-
-        my_path = game.path(me)
-        opp_path = game.path(opp)
-        Lm = len(my_path)
-        Lo = len(opp_path)
-
-        score = 0.0
-
-        # progress
-        score += 2.0 * sum(p for p in game.pos[me] if p >= 0)
-        score -= 2.0 * sum(p for p in game.pos[opp] if p >= 0)
-
-        # finished pieces (huge)
-        score += 15 * sum(p == Lm for p in game.pos[me])
-        score -= 15 * sum(p == Lo for p in game.pos[opp])
-
-        # rosettes
-        ROSETTES = {0, 4, 9, 13, 17}
-
-        for p in game.pos[me]:
-            if 0 <= p < Lm and my_path[p] in ROSETTES:
-                score += 3
 
-        for p in game.pos[opp]:
-            if 0 <= p < Lo and opp_path[p] in ROSETTES:
-                score -= 3
+class SparseExpectimax2Bot(Expectimax2Bot):
+    """Expectimax2Bot in sparse mode, sized for the 50-piece board."""
 
-        return score
+    budget = 20_000
+    max_replies = 4
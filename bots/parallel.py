@@ -0,0 +1,83 @@
+# bots/parallel.py
+"""
+Root-parallel Expectimax2Bot search over shared memory.
+
+The root position is written once into a SharedPositions slot and every
+worker scores a share of the root moves, reading the position out of the
+buffer, sharing leaf evaluations through a SharedMemoryEvalCache and
+writing (move, value) into a preallocated SharedResults slot. Tasks carry
+only small integers, so nothing game-sized is pickled per decision.
+
+    with ParallelSearch(rules, workers=4) as search:
+        move = search.choose(game, roll)
+
+choose() returns the same move as Expectimax2Bot(book=None).choose.
+"""
+import math
+import os
+from multiprocessing import Pool
+
+from ur.shared import SharedPositions, SharedResults
+from bots.utils import SharedMemoryEvalCache
+
+_worker = {}
+
+
+def _init_worker(positions, results, cache, bot_kwargs):
+    from bots.a_expectimax2 import Expectimax2Bot
+
+    _worker["positions"] = SharedPositions.attach(positions)
+    _worker["results"] = SharedResults.attach(results)
+    cache = SharedMemoryEvalCache.attach(cache)
+    # explicit weights would give the bot a private cache; pass ours instead
+    _worker["bot"] = Expectimax2Bot(book=None, cache=cache, **bot_kwargs)
+
+
+def _score_move(task):
+    slot, roll, move = task
+    game = _worker["positions"].get(0)
+    game.play_move(move, roll)
+    bot = _worker["bot"]
+    bot.use_rules(game.rules)
+    _worker["results"].put(slot, move, bot.expect_opp(game))
+
+
+class ParallelSearch:
+    def __init__(self, rules, workers=None, cache_slots=1 << 20, **bot_kwargs):
+        self.rules = rules
+        self.positions = SharedPositions(1, rules)
+        self.results = SharedResults(2 * rules.pieces)
+        self.cache = SharedMemoryEvalCache(rules, cache_slots)
+        self.pool = Pool(
+            workers or os.cpu_count(), _init_worker,
+            (self.positions.handle(), self.results.handle(), self.cache.handle(), bot_kwargs),
+        )
+
+    def choose(self, game, roll):
+        moves = game.legal_moves(roll)
+        if not moves:
+            return None
+        self.positions.put(0, game)
+        self.results.reset(len(moves))
+        self.pool.map(_score_move, [(i, roll, m) for i, m in enumerate(moves)])
+
+        best_val = -math.inf
+        best_move = None
+        for i in range(len(moves)):
+            move, val = self.results.get(i)
+            if val > best_val:
+                best_val = val
+                best_move = move
+        return best_move
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        for block in (self.positions, self.results, self.cache):
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
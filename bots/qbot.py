@@ -1,5 +1,8 @@
 # bots/qbot.py
 import pickle
+import struct
+from array import array
+from bisect import bisect_left
 from pathlib import Path
 import random
 
@@ -27,3 +30,126 @@ class QBot:
         maxq = max(qs)
         best = [m for m, q in zip(moves, qs) if q == maxq]
         return random.choice(best)
+
+
+# ---------------------------
+# Compact inference model
+# ---------------------------
+
+QTABLE_FILE = Path("trained") / "QBot.qtb"
+
+MAGIC = b"URQT"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBdI")  # magic, version, pieces, dtype, scale, entries
+DTYPES = {"float16": (0, "h"), "int8": (1, "b"), "float32": (2, "f")}
+_HALF = struct.Struct("<e")
+_BITS16 = struct.Struct("<h")
+
+
+def qtable_key(canonical, step):
+    """Symmetry-reduced key: UrGame.canonical_key() and the moving piece's step (-1 = enter)."""
+    return (canonical << 4) | (step + 1)
+
+
+class QTable:
+    """
+    Inference-only QBot values: sorted u64 keys (qtable_key) with float16,
+    int8 or float32 values in parallel arrays, looked up by binary search. Pieces on the
+    same step are interchangeable, so positions that differ only in piece
+    numbering share entries. Build one with `python -m training.compact_q`.
+    """
+
+    def __init__(self, pieces, dtype="float16", scale=1.0):
+        self.pieces = pieces
+        self.dtype = dtype
+        self.scale = scale
+        self.keys = array("Q")
+        self.values = array(DTYPES[dtype][1])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def nbytes(self):
+        return len(self.keys) * self.keys.itemsize + len(self.values) * self.values.itemsize
+
+    def get(self, key, default=0.0):
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return default
+        v = self.values[i]
+        if self.dtype == "float16":
+            return _HALF.unpack(_BITS16.pack(v))[0]
+        return v * self.scale
+
+    @classmethod
+    def from_entries(cls, entries, pieces, dtype="float16"):
+        """entries: {qtable_key: float}"""
+        scale = 1.0
+        if dtype == "int8":
+            scale = max((abs(v) for v in entries.values()), default=0.0) / 127 or 1.0
+        table = cls(pieces, dtype, scale)
+        for key in sorted(entries):
+            table.keys.append(key)
+            v = entries[key]
+            if dtype == "float16":
+                table.values.append(_BITS16.unpack(_HALF.pack(v))[0])
+            elif dtype == "float32":
+                table.values.append(v)
+            else:
+                table.values.append(round(v / scale))
+        return table
+
+    def save(self, path=QTABLE_FILE):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.pieces, DTYPES[self.dtype][0],
+                                self.scale, len(self.keys)))
+            f.write(self.keys.tobytes())
+            f.write(self.values.tobytes())
+
+    @classmethod
+    def load(cls, path=QTABLE_FILE):
+        with open(path, "rb") as f:
+            magic, version, pieces, code, scale, n = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a QBot table")
+            dtype = next(name for name, (c, _) in DTYPES.items() if c == code)
+            table = cls(pieces, dtype, scale)
+            table.keys.frombytes(f.read(8 * n))
+            table.values.frombytes(f.read(table.values.itemsize * n))
+        return table
+
+
+class CompactQBot:
+    """
+    QBot playing from a QTable. A move's value is looked up by the
+    position's canonical key and the step it moves from, with 0.0 for
+    unknown entries as in QBot, and ties are broken the same way.
+    """
+
+    def __init__(self, filename=QTABLE_FILE):
+        self.table = QTable.load(filename) if Path(filename).exists() else None
+
+    def move_values(self, game, moves):
+        if self.table is None:
+            return [0.0] * len(moves)
+        canonical = game.canonical_key()
+        mine = game.pos[game.turn]
+        by_step = {}
+        qs = []
+        for m in moves:
+            step = mine[m]
+            if step not in by_step:
+                by_step[step] = self.table.get(qtable_key(canonical, step))
+            qs.append(by_step[step])
+        return qs
+
+    def choose(self, game, roll):
+        moves = game.legal_moves(roll)
+        if not moves:
+            return None
+
+        qs = self.move_values(game, moves)
+        maxq = max(qs)
+        best = [m for m, q in zip(moves, qs) if q == maxq]
+        return random.choice(best)
@@ -0,0 +1,75 @@
+# bots/registry.py
+import hashlib
+import importlib
+import importlib.util
+import json
+from collections.abc import Mapping
+from pathlib import Path
+
+BOTS_DIR = Path(__file__).parent
+MANIFEST = BOTS_DIR / "manifest.json"
+
+# modules in bots/ that are not tournament bots
+HELPER_MODULES = {"__init__", "utils", "registry", "qbot", "parallel"}
+
+
+def find_bot_class(mod):
+    """First class in the module with a choose() method."""
+    for attr in dir(mod):
+        obj = getattr(mod, attr)
+        # Only accept actual bot classes with choose()
+        if isinstance(obj, type) and hasattr(obj, "choose"):
+            return obj
+    raise RuntimeError(f"No bot class found in {mod.__name__}")
+
+
+class BotRegistry(Mapping):
+    """
+    name -> bot class, importing each bot module only on first access.
+
+    Bots are listed from bots/manifest.json ("name": "module:Class"); any
+    other bots/*.py that is not a helper module is listed too and its class
+    found on import, so dropping a new file into bots/ still works.
+    """
+
+    def __init__(self, names=None):
+        specs = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
+        for file in sorted(BOTS_DIR.glob("*.py")):
+            if file.stem not in specs and file.stem not in HELPER_MODULES:
+                specs[file.stem] = f"bots.{file.stem}"
+
+        if names is not None:
+            missing = [n for n in names if n not in specs]
+            if missing:
+                raise KeyError(f"unknown bots: {', '.join(missing)}")
+            specs = {n: specs[n] for n in names}
+
+        self.specs = specs
+        self.classes = {}
+
+    def __getitem__(self, name):
+        if name not in self.classes:
+            modname, _, clsname = self.specs[name].partition(":")
+            mod = importlib.import_module(modname)
+            self.classes[name] = getattr(mod, clsname) if clsname else find_bot_class(mod)
+        return self.classes[name]
+
+    def version(self, name):
+        """
+        Short hash of the source of a bot's module and of the helper modules
+        in bots/, without importing the bot. The result store keys games by
+        it, so a bot whose code changed is played again.
+        """
+        modname = self.specs[name].partition(":")[0]
+        h = hashlib.sha1(Path(importlib.util.find_spec(modname).origin).read_bytes())
+        for helper in sorted(HELPER_MODULES):
+            file = BOTS_DIR / f"{helper}.py"
+            if file.exists():
+                h.update(file.read_bytes())
+        return h.hexdigest()[:12]
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
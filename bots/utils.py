@@ -1,6 +1,14 @@
 # bots/utils.py
+import json
+import struct
+from collections import OrderedDict, defaultdict
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
 from typing import Optional, Set
 
+from ur.race import RaceTable
+from ur.rules import DEFAULT_RULES
+
 def final_step_len(game, player) -> int:
     """Return number of on-board steps for player (FINAL_STEP)."""
     return len(game.path(player))
@@ -34,10 +42,10 @@ def landing_square(game, player: int, piece: int, roll: int) -> Optional[int]:
     return game.path(player)[step]
 
 def is_rosette(game, square: int) -> bool:
-    return square in getattr(game, "ROSETTES", set())
+    return square in game.rules.rosettes
 
 def is_safe_square(game, square: int) -> bool:
-    return square in getattr(game, "SAFE_SQUARES", set())
+    return square in game.rules.safe_squares
 
 def will_capture(game, player: int, piece: int, roll: int) -> bool:
     """
@@ -117,3 +125,359 @@ def can_opp_capture_after_move(game, player: int, piece: int, roll: int) -> bool
 
     return False
 
+
+def distinct_moves(game, moves):
+    """One move per starting step; pieces on the same step are interchangeable."""
+    mine = game.pos[game.turn]
+    seen = set()
+    out = []
+    for m in moves:
+        if mine[m] not in seen:
+            seen.add(mine[m])
+            out.append(m)
+    return out
+
+
+class SearchStats:
+    """
+    Counters for search bots. A bot with a `stats` attribute set to one of
+    these counts its work; with stats = None (the default) nothing is counted.
+
+    nodes[d] counts positions generated d plies below the root (a pass on a
+    chance outcome counts as a node too). The effective branching factor of a
+    choose() is leaves ** (1 / depth).
+    """
+
+    def __init__(self):
+        self.chooses = 0
+        self.nodes = defaultdict(int)
+        self.clones = 0
+        self.legal_calls = 0
+        self.eval_calls = 0
+        self.book_hits = 0
+        self.ebf_sum = 0.0
+        self._evals_at_begin = 0
+
+    def begin(self):
+        self.chooses += 1
+        self._evals_at_begin = self.eval_calls
+
+    def end(self, depth: int):
+        leaves = self.eval_calls - self._evals_at_begin
+        if leaves > 0:
+            self.ebf_sum += leaves ** (1 / depth)
+
+    def summary(self) -> dict:
+        n = max(self.chooses, 1)
+        row = {
+            "chooses": self.chooses,
+            "clones_per_choose": self.clones / n,
+            "legal_calls_per_choose": self.legal_calls / n,
+            "evals_per_choose": self.eval_calls / n,
+            "ebf": self.ebf_sum / n,
+            "book_hits": self.book_hits,
+        }
+        for d in sorted(self.nodes):
+            row[f"nodes_d{d}_per_choose"] = self.nodes[d] / n
+        return row
+
+
+class EvalCache:
+    """
+    Bounded LRU cache of leaf evaluations keyed by UrGame.canonical_key(),
+    so positions that differ only in piece numbering share one entry. Keys
+    are only comparable under one rules variant; the cache clears itself
+    when it sees a game with different rules.
+    """
+
+    def __init__(self, maxsize: int = 200_000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.rules = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, game) -> int:
+        if game.rules is not self.rules:
+            self.data.clear()
+            self.rules = game.rules
+        return game.canonical_key()
+
+    def get(self, key: int) -> Optional[float]:
+        val = self.data.get(key)
+        if val is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.data.move_to_end(key)
+        return val
+
+    def put(self, key: int, val: float):
+        self.data[key] = val
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "size": len(self.data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+        }
+
+
+# one cache shared by every expectimax bot in the process (same eval function)
+SHARED_EVAL_CACHE = EvalCache()
+
+
+_BITS = struct.Struct("<d")
+_GOLDEN = 0x9E3779B97F4A7C15  # Fibonacci hashing multiplier
+_MASK64 = (1 << 64) - 1
+
+
+class SharedMemoryEvalCache:
+    """
+    EvalCache interface over a fixed-size hash table in shared memory, so
+    search workers in different processes share leaf evaluations without
+    pickling. Slot i holds two u64 words, (key ^ value bits, value bits):
+    a torn or concurrent write fails the xor check and reads as a miss, so
+    no locking is needed. A colliding key simply replaces the old entry.
+    slots must be a power of two.
+
+    Create it in the parent, pass handle() to the workers and attach()
+    there. Only positions under the rules it was created for are accepted.
+    """
+
+    def __init__(self, rules, slots: int = 1 << 20, shm=None):
+        # keys (plus the empty-slot offset) must fit in one u64 word
+        if 1 + 2 * (rules.pieces.bit_length() + rules.final_step) > 63:
+            raise ValueError(f"canonical keys of {rules.name} do not fit in 64 bits")
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.rules = rules
+        self.slots = slots
+        self.shift = 64 - slots.bit_length() + 1
+        self.owner = shm is None
+        self.shm = shm if shm is not None else SharedMemory(create=True, size=16 * slots)
+        self.words = self.shm.buf.cast("Q")
+        self.hits = 0
+        self.misses = 0
+
+    def handle(self):
+        return self.shm.name, self.slots, self.rules.name
+
+    @classmethod
+    def attach(cls, handle):
+        from ur.rules import get_rules
+        from ur.shared import attach
+
+        name, slots, rules_name = handle
+        return cls(get_rules(rules_name), slots, attach(name))
+
+    def key(self, game) -> int:
+        if game.rules.name != self.rules.name:
+            raise ValueError(f"cache holds {self.rules.name} positions, not {game.rules.name}")
+        # +1 so that an all-zero (empty) slot never matches a real key
+        return game.canonical_key() + 1
+
+    def get(self, key: int) -> Optional[float]:
+        i = 2 * ((key * _GOLDEN & _MASK64) >> self.shift)
+        bits = self.words[i + 1]
+        if self.words[i] ^ bits != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _BITS.unpack(bits.to_bytes(8, "little"))[0]
+
+    def put(self, key: int, val: float):
+        i = 2 * ((key * _GOLDEN & _MASK64) >> self.shift)
+        bits = int.from_bytes(_BITS.pack(val), "little")
+        self.words[i + 1] = bits
+        self.words[i] = key ^ bits
+
+    def clear(self):
+        self.shm.buf[:] = bytes(16 * self.slots)
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "size": sum(1 for i in range(0, 2 * self.slots, 2) if self.words[i] or self.words[i + 1]),
+            "maxsize": self.slots,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+        }
+
+    def close(self):
+        self.words.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+
+# ---------------------------
+# Evaluation weights
+# ---------------------------
+
+EVAL_PARAMS = ("progress", "finished", "rosette")
+DEFAULT_EVAL_WEIGHTS = (2.0, 15.0, 3.0)
+EVAL_WEIGHTS_FILE = Path("trained") / "eval_weights.json"
+
+_loaded_weights = {}
+
+def _read_eval_weights(path) -> dict:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+def load_eval_weights(rules=DEFAULT_RULES, path=EVAL_WEIGHTS_FILE) -> tuple:
+    """
+    Weight vector (progress, finished, rosette) for eval_position under
+    `rules`: the values tuned for that variant in trained/eval_weights.json
+    (keyed by rules name) if present, else the defaults. The file is read
+    once per process, so every bot shares the same tuples.
+    """
+    path = Path(path)
+    if path not in _loaded_weights:
+        _loaded_weights[path] = {
+            name: tuple(float(entry[k]) for k in EVAL_PARAMS)
+            for name, entry in _read_eval_weights(path).items()
+        }
+    return _loaded_weights[path].get(rules.name, DEFAULT_EVAL_WEIGHTS)
+
+def save_eval_weights(weights, rules, path=EVAL_WEIGHTS_FILE, **extra):
+    """Store `weights` as the tuned values for `rules`, keeping other variants' entries."""
+    path = Path(path)
+    data = _read_eval_weights(path)
+    data[rules.name] = {**dict(zip(EVAL_PARAMS, weights)), **extra}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=1))
+    _loaded_weights.pop(path, None)
+
+def eval_position(game, weights) -> float:
+    """Static evaluation from the point of view of the player to move."""
+    w_progress, w_finished, w_rosette = weights
+    me = game.turn
+    opp = me ^ 1
+    final = game.rules.final_step
+
+    score = 0.0
+
+    # progress
+    score += w_progress * sum(p for p in game.pos[me] if p >= 0)
+    score -= w_progress * sum(p for p in game.pos[opp] if p >= 0)
+
+    # finished pieces (huge)
+    score += w_finished * sum(p == final for p in game.pos[me])
+    score -= w_finished * sum(p == final for p in game.pos[opp])
+
+    # rosettes
+    my_rosettes = game.rules.rosette_steps[me]
+    opp_rosettes = game.rules.rosette_steps[opp]
+    score += w_rosette * sum(1 for p in game.pos[me] if 0 <= p < final and my_rosettes[p])
+    score -= w_rosette * sum(1 for p in game.pos[opp] if 0 <= p < final and opp_rosettes[p])
+
+    return score
+
+
+# ---------------------------
+# Expectimax bots
+# ---------------------------
+
+DICE_PROBS = {
+    0: 1/16,
+    1: 4/16,
+    2: 6/16,
+    3: 4/16,
+    4: 1/16,
+}
+
+
+class ExpectimaxBase:
+    """
+    What the expectimax bots share: weights, leaf evaluation and the
+    shortcuts taken before searching.
+
+    Set `stats` to a SearchStats to count search work, and `book` to a
+    ur.book.OpeningBook to answer book positions without search. Leaf
+    evaluations use eval_position with the weights tuned for the game's
+    rules (see load_eval_weights) and go through SHARED_EVAL_CACHE, unless
+    other weights or another cache are given. Books are searched with the
+    default weights, so the book is skipped while any other weights are
+    active. With race=True, races (see ur.race) small enough to solve are
+    played from the exact table.
+    """
+
+    stats = None
+    book = None
+    race = False
+    tuned = False
+
+    def __init__(self, cache=None, weights=None, race=False):
+        if race:
+            self.race = race
+        if weights is None:
+            self.tuned = True
+            self.weights = load_eval_weights()
+            self.cache = cache if cache is not None else SHARED_EVAL_CACHE
+        else:
+            # cached values are only valid for one weight vector
+            self.weights = tuple(weights)
+            self.cache = cache if cache is not None else EvalCache()
+
+    def use_rules(self, rules):
+        """Switch to the weights tuned for `rules` unless explicit weights were given."""
+        if self.tuned:
+            self.weights = load_eval_weights(rules)
+
+    def shortcut(self, game, roll):
+        """The book or race-table move for this position, or None to search."""
+        if self.book is not None and self.weights == DEFAULT_EVAL_WEIGHTS:
+            move = self.book.lookup(game, roll)
+            if move is not None:
+                if self.stats is not None:
+                    self.stats.book_hits += 1
+                return move
+        if self.race:
+            table = RaceTable.shared(game.rules)
+            if table.solvable(game):
+                return table.best_move(game, roll)
+        return None
+
+    def choose_batch(self, games, rolls):
+        """Decisions for several positions in one call (one round-trip when offloaded)."""
+        return [self.choose(g, r) for g, r in zip(games, rolls)]
+
+    def eval(self, game):
+        if self.stats is not None:
+            self.stats.eval_calls += 1
+
+        cache = self.cache
+        if cache is None:
+            return self.score(game)
+        key = cache.key(game)
+        val = cache.get(key)
+        if val is None:
+            val = self.score(game)
+            cache.put(key, val)
+        return val
+
+    def score(self, game):
+        return eval_position(game, self.weights)
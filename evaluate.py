@@ -1,50 +1,40 @@
 # evaluate.py
 import sys
-import importlib
+import math
+import argparse
+import cProfile
+import pstats
+import random
 from pathlib import Path
 import time
 from collections import defaultdict
+from statistics import NormalDist
 
-
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from tqdm import tqdm
+# numpy/pandas/matplotlib/tqdm are imported where they are used, so a quick
+# match or a `--list` does not pay for them at startup
 
 from ur.game import UrGame
+from ur.fast import ENGINES, get_engine
+from ur.rules import DEFAULT_RULES, VARIANTS, get_rules
+from tournament.ratings import RatingLadder
+from tournament.store import DEFAULT_SET, ResultStore, game_seed
+from tournament.records import RecordWriter
+from tournament.latency import new_timing_entry, record_latency, latency_rows
+from tournament.aggregate import StreamingAggregator
+from bots.utils import SearchStats, SHARED_EVAL_CACHE
+from bots.registry import BotRegistry
 
 
 # ---------------------------
 # Load all bot classes
 # ---------------------------
 
-BOTS_DIR = Path("bots")
-
-def load_bots():
-    bot_classes = {}
-
-    for file in BOTS_DIR.glob("*.py"):
-        if file.name in ("__init__.py", "utils.py","qbot.py"):
-            continue
-
-        modname = f"bots.{file.stem}"
-        mod = importlib.import_module(modname)
-
-        found_class = None
-
-        for attr in dir(mod):
-            obj = getattr(mod, attr)
-            # Only accept actual bot classes with choose()
-            if isinstance(obj, type) and hasattr(obj, "choose"):
-                found_class = obj
-                break
-
-        if found_class is None:
-            raise RuntimeError(f"No bot class found in {file.name}")
-
-        bot_classes[file.stem] = found_class
-
-    return bot_classes
+def load_bots(names=None):
+    """
+    name -> bot class for every bot in bots/ (or just `names`). Bots are
+    listed from bots/manifest.json and each module is imported on first use.
+    """
+    return BotRegistry(names)
 
 
 
@@ -53,19 +43,49 @@ def load_bots():
 # Play one game
 # ---------------------------
 
-def play_game(bot0, bot1):
-    game = UrGame()
+def play_game(bot0, bot1, seed=None, info=None, record=None, rules=None, engine=None):
+    """
+    Play one game and return the winning seat.
+
+    seed reseeds the global RNG, which drives both the dice and the bots.
+    If an info dict is given it receives the number of plies (dice rolls)
+    and each seat's think time and number of choose() calls. If a record
+    list is given, (roll, piece) is appended to it for every ply, with
+    piece None when the turn passed. rules selects a ur.rules variant and
+    engine the game class (UrGame unless e.g. ur.fast.FastGame is given).
+    """
+    if seed is not None:
+        random.seed(seed)
+
+    game = (engine or UrGame)(rules)
     bots = [bot0, bot1]
+    # TimedBot bins latencies by move count; hand it the count instead of recomputing it
+    timed = [isinstance(b, TimedBot) for b in bots]
+    plies = 0
+    times = [0.0, 0.0]
+    calls = [0, 0]
 
     while game.winner is None:
         roll = game.roll_dice()
         moves = game.legal_moves(roll)
+        plies += 1
 
         if not moves:
+            if record is not None:
+                record.append((roll, None))
             game.turn = 1 - game.turn
             continue
 
-        choice = bots[game.turn].choose(game, roll)
+        t0 = time.perf_counter()
+        if timed[game.turn]:
+            choice = bots[game.turn].choose(game, roll, len(moves))
+        else:
+            choice = bots[game.turn].choose(game, roll)
+        times[game.turn] += time.perf_counter() - t0
+        calls[game.turn] += 1
+
+        if record is not None:
+            record.append((roll, choice))
 
         if choice is None:
             game.turn = 1 - game.turn
@@ -73,13 +93,17 @@ def play_game(bot0, bot1):
 
         game.play_move(choice, roll)
 
+    if info is not None:
+        info["plies"] = plies
+        info["times"] = times
+        info["calls"] = calls
+
     return game.winner
 
 
 # ---------------------------
 # Tournament
 # ---------------------------
-from pathlib import Path
 
 def make_bot(cls):
     # Try no-arg constructor first
@@ -96,81 +120,242 @@ class TimedBot:
         self.name = name
         self.stats = stats
 
-    def choose(self, game, roll):
+        entry = stats[name]
+        # search bots expose a `stats` slot; share one SearchStats per bot name
+        if hasattr(bot, "stats"):
+            if "search" not in entry:
+                entry["search"] = SearchStats()
+            bot.stats = entry["search"]
+        # set by run_tournament(profile=name)
+        self.profiler = entry.get("profiler")
+
+    def choose(self, game, roll, n_moves=None):
+        """n_moves: number of legal moves, if the caller already knows it."""
+        if n_moves is None:
+            n_moves = len(game.legal_moves(roll))
+
+        if self.profiler is not None:
+            self.profiler.enable()
         t0 = time.perf_counter()
         move = self.bot.choose(game, roll)
         dt = time.perf_counter() - t0
+        if self.profiler is not None:
+            self.profiler.disable()
 
         self.stats[self.name]["time"] += dt
         self.stats[self.name]["calls"] += 1
+        record_latency(self.stats[self.name], dt, n_moves)
 
         return move
 
-def run_tournament(games_per_pair=100):
-    bot_classes = load_bots()
-    names = list(bot_classes.keys())
-    M = len(names)
+def play_pair_game(bot_classes, nameA, nameB, k, timing_stats, store=None, base_seed=0,
+                   records=None, rules=None, engine=None):
+    """
+    Play game k of the A-vs-B pairing; return True if A won.
 
-    overall_wins = {n: 0 for n in names}
-    overall_games = {n: 0 for n in names}
+    With a ResultStore, a game already stored under the same seed is not
+    replayed: its stored result and think times are used instead, provided
+    it is in the store's result set and both bots still have the versions
+    it was played with. With a
+    RecordWriter, every game actually played is saved move by move.
+    """
+    # alternate starting player
+    if k % 2 == 0:
+        seats = (nameA, nameB)
+        mapA_player = 0
+    else:
+        seats = (nameB, nameA)
+        mapA_player = 1
 
-    pairwise = np.full((M, M), np.nan)
+    seed = game_seed(nameA, nameB, k, base_seed)
 
-    # timing stats
-    timing_stats = defaultdict(lambda: {"time": 0.0, "calls": 0})
+    if store is not None:
+        row = store.get(seats[0], seats[1], seed)
+        if row is not None:
+            for name, t, calls in zip(seats, row["times"], row["calls"]):
+                timing_stats[name]["time"] += t
+                timing_stats[name]["calls"] += calls
+            return row["winner"] == mapA_player
 
-    total_pairs = M * (M - 1) // 2
-    pbar = tqdm(total=total_pairs)
+    bot0 = TimedBot(make_bot(bot_classes[seats[0]]), seats[0], timing_stats)
+    bot1 = TimedBot(make_bot(bot_classes[seats[1]]), seats[1], timing_stats)
 
-    for i in range(M):
-        for j in range(i + 1, M):
-            nameA = names[i]
-            nameB = names[j]
+    info = {}
+    plies = [] if records is not None else None
+    winner = play_game(bot0, bot1, seed=seed, info=info, record=plies, rules=rules,
+                       engine=engine)
 
-            winsA = 0
+    if records is not None:
+        records.write(seed, plies, pieces=(rules or DEFAULT_RULES).pieces)
 
-            for k in range(games_per_pair):
-                pbar.set_description(f"{nameA} vs {nameB}")
-                # alternate starting player
-                if k % 2 == 0:
-                    bot0 = TimedBot(make_bot(bot_classes[nameA]), nameA, timing_stats)
-                    bot1 = TimedBot(make_bot(bot_classes[nameB]), nameB, timing_stats)
-                    mapA_player = 0
-                else:
-                    bot0 = TimedBot(make_bot(bot_classes[nameB]), nameB, timing_stats)
-                    bot1 = TimedBot(make_bot(bot_classes[nameA]), nameA, timing_stats)
-                    mapA_player = 1
+    if store is not None:
+        store.add(seats[0], seats[1], seed, winner, info["plies"], info["times"], info["calls"])
+
+    return winner == mapA_player
+
+
+# ---------------------------
+# Adaptive scheduling
+# ---------------------------
 
-                winner = play_game(bot0, bot1)
+def wilson_interval(wins, n, z=1.96):
+    """Wilson score interval for a win rate of wins/n."""
+    if n == 0:
+        return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return centre - half, centre + half
+
+def pair_settled(wins, n, precision, min_games, alpha=0.05):
+    """
+    A pair is settled once the stronger bot is known or its interval is
+    narrower than +/- precision.
+
+    The pair is checked after every two games, so "stronger bot known"
+    spends alpha across the checks: check k (1 at min_games) must exclude
+    0.5 at level alpha / (k * (k + 1)). These sum to alpha, so the chance
+    of ever stopping on a wrong winner stays within alpha however many
+    checks a pair gets.
+    """
+    if n < min_games:
+        return False
+    k = (n - min_games) // 2 + 1
+    z = NormalDist().inv_cdf(1 - alpha / (2 * k * (k + 1)))
+    lo, hi = wilson_interval(wins, n, z)
+    if lo > 0.5 or hi < 0.5:
+        return True
+    lo, hi = wilson_interval(wins, n)
+    return (hi - lo) / 2 <= precision
+
+def run_tournament(games_per_pair=100, adaptive=False, precision=0.1, min_games=10,
+                   ladder=None, store=None, base_seed=0, records=None, profile=None,
+                   rules=None, bots=None, flush_every=30.0, engine=None):
+    """
+    Round-robin over all bots. If a RatingLadder is given, every pair's
+    results are added to it. With a ResultStore every game is appended to
+    it as it finishes, and games already stored are skipped, so an
+    interrupted run picks up where it stopped. A RecordWriter receives
+    the move record of every game played. profile names one bot whose
+    choose() calls run under cProfile. rules selects a ur.rules variant
+    for every game and engine the game class. bots restricts the
+    round-robin to the named bots.
+
+    Results are aggregated per game by a StreamingAggregator, which writes
+    live_progress.json and live_*.csv every flush_every seconds and once
+    more when the run ends or fails.
+
+    With adaptive=True, games_per_pair is only an upper bound: games go to
+    the unsettled pair with the widest Wilson interval, two at a time so
+    seats stay balanced, and a pair stops as soon as pair_settled() holds
+    or it reaches the cap.
+    """
+    from tqdm import tqdm
+
+    bot_classes = load_bots(bots)
+    names = list(bot_classes.keys())
 
-                if winner == mapA_player:
-                    winsA += 1
+    # timing stats
+    timing_stats = defaultdict(new_timing_entry)
+    if profile is not None:
+        timing_stats[profile]["profiler"] = cProfile.Profile()
 
-            winsB = games_per_pair - winsA
+    agg = StreamingAggregator(names, timing_stats, flush_every=flush_every)
+    pairs = agg.pairs
+    wins = agg.wins
+    played = agg.played
 
-            pairwise[i][j] = winsA / games_per_pair
-            pairwise[j][i] = winsB / games_per_pair
+    pbar = tqdm(total=len(pairs))
 
-            overall_wins[nameA] += winsA
-            overall_wins[nameB] += winsB
+    try:
+        _play_pairs(agg, bot_classes, games_per_pair, adaptive, precision, min_games,
+                    store, base_seed, records, rules, engine, pbar)
+    finally:
+        pbar.close()
+        agg.flush()
+
+    if ladder is not None:
+        for i, j in pairs:
+            ladder.record_pair(names[i], names[j], wins[(i, j)], played[(i, j)])
+
+    return agg.results()
+
+def _play_pairs(agg, bot_classes, games_per_pair, adaptive, precision, min_games,
+                store, base_seed, records, rules, engine, pbar):
+    names = agg.names
+    pairs = agg.pairs
+    wins = agg.wins
+    played = agg.played
+    timing_stats = agg.timing_stats
+
+    if adaptive:
+        open_pairs = set(pairs)
+        while open_pairs:
+            def width(pair):
+                lo, hi = wilson_interval(wins[pair], played[pair])
+                return (hi - lo, -played[pair])
+
+            i, j = max(open_pairs, key=width)
+            nameA = names[i]
+            nameB = names[j]
+            pbar.set_description(f"{nameA} vs {nameB}")
+
+            # two games keep the seats balanced, but never past the cap
+            for _ in range(min(2, games_per_pair - played[(i, j)])):
+                agg.add(i, j, play_pair_game(bot_classes, nameA, nameB, played[(i, j)],
+                                             timing_stats, store, base_seed, records, rules,
+                                             engine))
+
+            if (played[(i, j)] >= games_per_pair
+                    or pair_settled(wins[(i, j)], played[(i, j)], precision, min_games)):
+                open_pairs.remove((i, j))
+                pbar.update(1)
+    else:
+        for i, j in pairs:
+            nameA = names[i]
+            nameB = names[j]
 
-            overall_games[nameA] += games_per_pair
-            overall_games[nameB] += games_per_pair
+            for k in range(games_per_pair):
+                pbar.set_description(f"{nameA} vs {nameB}")
+                agg.add(i, j, play_pair_game(bot_classes, nameA, nameB, k, timing_stats,
+                                             store, base_seed, records, rules, engine))
 
             pbar.update(1)
 
-    pbar.close()
-    return names, overall_wins, overall_games, pairwise, timing_stats
-
 # ---------------------------
 # Plot + Save
 # ---------------------------
 
+def calibrate_bot(name, ladder, anchors=3, games_per_anchor=10, store=None, rules=None,
+                  engine=None):
+    """Rate a new bot against a few anchors of an existing ladder."""
+    bot_classes = load_bots()
+    timing_stats = defaultdict(new_timing_entry)
+
+    def play(nameA, nameB, k):
+        return play_pair_game(bot_classes, nameA, nameB, k, timing_stats, store, rules=rules,
+                              engine=engine)
+
+    return ladder.calibrate(name, play, anchors=anchors, games_per_anchor=games_per_anchor)
+
+def save_ratings(ladder):
+    import pandas as pd
+
+    rdf = pd.DataFrame(ladder.table(), columns=["bot", "elo", "ci_low", "ci_high", "games"])
+    rdf.to_csv("ratings.csv", index=False)
+    print("ratings.csv")
+
 def save_results(names, overall_wins, overall_games, pairwise,timing_stats):
+    import numpy as np
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
     # ---- overall dataframe ----
     rows = []
     for n in names:
-        wr = overall_wins[n] / overall_games[n]
+        # a mid-run snapshot can hold bots that have not played yet
+        wr = overall_wins[n] / overall_games[n] if overall_games[n] else 0.0
         rows.append([n, overall_wins[n], overall_games[n], wr])
 
     df = pd.DataFrame(rows, columns=["bot","wins","games","winrate"])
@@ -235,12 +420,152 @@ def save_results(names, overall_wins, overall_games, pairwise,timing_stats):
     print("bot_timings.csv")
     print("bot_avg_time.png")
 
+    # ---- latency percentiles ----
+    # games resumed from a ResultStore (and --report snapshots) only carry totals
+    rows = latency_rows(timing_stats, names)
+    if rows:
+        ldf = pd.DataFrame(
+            rows, columns=["bot", "moves", "calls", "p50_sec", "p90_sec", "p99_sec", "max_sec"]
+        )
+        ldf.to_csv("bot_latency.csv", index=False)
+
+        overall = ldf[ldf["moves"] == "all"].sort_values("p99_sec", ascending=False)
+        x = np.arange(len(overall))
+        plt.figure(figsize=(10,6))
+        for k, col in enumerate(["p50_sec", "p90_sec", "p99_sec", "max_sec"]):
+            plt.bar(x + (k - 1.5) * 0.2, overall[col], width=0.2, label=col[:-4])
+        plt.yscale("log")
+        plt.ylabel("Time per move (seconds)")
+        plt.title("Bot Decision Latency Percentiles")
+        plt.xticks(x, overall["bot"], rotation=45, ha="right")
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig("bot_latency.png")
+        plt.close()
+
+        print("bot_latency.csv")
+        print("bot_latency.png")
+    else:
+        print("no latency histograms (no games were played in this run)")
+
+    # ---- search instrumentation ----
+    search_rows = [
+        {"bot": n, **timing_stats[n]["search"].summary()}
+        for n in names if "search" in timing_stats[n]
+    ]
+    if search_rows:
+        pd.DataFrame(search_rows).to_csv("search_stats.csv", index=False)
+        print("search_stats.csv")
+        print("eval cache:", SHARED_EVAL_CACHE.summary())
+
+    # ---- profiler output ----
+    for n in names:
+        profiler = timing_stats[n].get("profiler")
+        if profiler is None:
+            continue
+        profiler.dump_stats(f"profile_{n}.prof")
+        with open(f"profile_{n}.txt", "w") as f:
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+        print(f"profile_{n}.prof")
+        print(f"profile_{n}.txt")
+
 
 
 # ---------------------------
 # Main
 # ---------------------------
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bot vs bot tournament")
+    parser.add_argument("--bots", help="comma-separated subset of bots (default: all)")
+    parser.add_argument("--list", action="store_true", help="list available bots and exit")
+    parser.add_argument("--games", type=int, default=None,
+                        help="games per pair (cap per pair with --adaptive)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="settle each pair early instead of always playing --games")
+    parser.add_argument("--precision", type=float, default=0.1)
+    parser.add_argument("--rules", default=DEFAULT_RULES.name, choices=sorted(VARIANTS),
+                        help="ur.rules variant; each gets its own store and ladder")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for game seeds")
+    parser.add_argument("--engine", default="ur", choices=sorted(ENGINES),
+                        help="game engine; fast is ur.fast.FastGame (identical results)")
+    parser.add_argument("--flush-every", type=float, default=30.0,
+                        help="seconds between live_* progress files")
+    parser.add_argument("--record", metavar="FILE", help="append move records of every game played")
+    parser.add_argument("--profile", metavar="BOT", help="run this bot's decisions under cProfile")
+    parser.add_argument("--calibrate", metavar="BOT",
+                        help="rate one new bot against ladder anchors instead of a full run")
+    parser.add_argument("--result-set", default=DEFAULT_SET,
+                        help="stored games are only reused within the same result set")
+    parser.add_argument("--fresh", action="store_true",
+                        help="start a new result set instead of reusing stored games, "
+                             "e.g. after retraining weights or books")
+    parser.add_argument("--report", action="store_true",
+                        help="rebuild all outputs from the result store without playing")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    names, wins, games, pairwise,timing_stats = run_tournament(games_per_pair=20)
+    args = parse_args()
+
+    if args.list:
+        for name, spec in load_bots().specs.items():
+            print(f"{name:20s} {spec}")
+        sys.exit(0)
+
+    bots = args.bots.split(",") if args.bots else None
+    rules = get_rules(args.rules)
+    engine = get_engine(args.engine)
+    suffix = "" if rules is DEFAULT_RULES else f"_{rules.name}"
+    ratings_file = f"ratings{suffix}.json"
+
+    # every game goes to results.db; rerunning resumes instead of replaying,
+    # except for bots whose source changed since and with --fresh
+    registry = load_bots()
+    versions = {name: registry.version(name) for name in registry}
+    store = ResultStore(f"results{suffix}.db", result_set=args.result_set, versions=versions)
+    if args.fresh:
+        store.result_set = store.run
+        print(f"new result set {store.run}; pass --result-set {store.run} to resume it")
+
+    if args.report:
+        save_results(*store.aggregate(bots))
+        ladder = RatingLadder.from_results(store.pair_counts())
+        ladder.fit()
+        ladder.save(ratings_file)
+        save_ratings(ladder)
+        sys.exit(0)
+
+    if args.calibrate:
+        # the saved ratings pick the anchors; the calibration games land in
+        # the store, and the ladder is then refit from the store so that
+        # recalibrating does not count the same games twice
+        try:
+            calibrate_bot(args.calibrate, RatingLadder.load(ratings_file), store=store,
+                          rules=rules, engine=engine)
+        except ValueError as e:
+            sys.exit(f"cannot calibrate {args.calibrate}: {e}")
+        ladder = RatingLadder.from_results(store.pair_counts())
+        r = ladder.fit()[args.calibrate]
+        ladder.save(ratings_file)
+        save_ratings(ladder)
+        print(f"{args.calibrate}: {r['elo']:.0f} +/- {1.96 * r['se']:.0f} Elo")
+        sys.exit(0)
+
+    games = args.games if args.games is not None else (100 if args.adaptive else 20)
+    records = RecordWriter(args.record) if args.record else None
+    names, wins, games, pairwise,timing_stats = run_tournament(
+        games_per_pair=games, adaptive=args.adaptive, precision=args.precision,
+        store=store, base_seed=args.seed, records=records, profile=args.profile,
+        rules=rules, bots=bots, flush_every=args.flush_every, engine=engine
+    )
+    if records is not None:
+        records.close()
     save_results(names, wins, games, pairwise,timing_stats)
+
+    # ratings are refit from every stored game, so resumed or repeated runs
+    # are never double counted
+    ladder = RatingLadder.from_results(store.pair_counts())
+    ladder.fit()
+    ladder.save(ratings_file)
+    save_ratings(ladder)
@@ -1,6 +1,8 @@
 import tkinter as tk
-import random
-from ur.game import UrGame, ROSETTES, SAFE_SQUARES, FINAL_STEP
+from concurrent.futures import ThreadPoolExecutor
+
+from ur.game import UrGame
+from evaluate import load_bots, make_bot
 
 CELL = 60
 
@@ -10,42 +12,65 @@ BOARD_COORDS = {
     13:(2,0),14:(2,1),15:(2,2),16:(2,3),17:(2,5),18:(2,6)
 }
 
-# ---------------- Bots ----------------
-
-class RandomBot:
-    def choose(self, game, roll):
-        moves = game.legal_moves(roll)
-        if not moves:
-            return None
-        return random.choice(moves)
+COLORS = ("red", "blue")
 
-BOT1 = RandomBot()
-BOT2 = RandomBot()
+DEFAULT_BOT = "random_bot"
 
 # ---------------- GUI ----------------
 
 class UrGUI:
+    """
+    Bot-vs-bot viewer. Board squares and piece items are created once and
+    only moved or hidden afterwards; bot decisions run on a worker thread
+    and their result is picked up from the Tk loop with after().
+    """
+
     def __init__(self):
         self.game = UrGame()
         self.root = tk.Tk()
         self.root.title("Royal Game of Ur — Animated Bots")
 
+        self.bot_classes = load_bots()
+        self.bots = [None, None]
+        self.bot_vars = []
+        bar = tk.Frame(self.root)
+        bar.pack()
+        for p in (0, 1):
+            tk.Label(bar, text=f"Player {p+1}:", fg=COLORS[p]).pack(side="left")
+            var = tk.StringVar(value=DEFAULT_BOT)
+            var.trace_add("write", lambda *_, p=p: self.select_bot(p))
+            tk.OptionMenu(bar, var, *sorted(self.bot_classes)).pack(side="left")
+            self.bot_vars.append(var)
+            self.select_bot(p)
+
         self.canvas = tk.Canvas(self.root, width=7*CELL, height=3*CELL, bg="burlywood3")
         self.canvas.pack()
 
         self.info = tk.Label(self.root, font=("Arial",14))
         self.info.pack()
 
+        self.worker = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
         self.draw_board()
+        self.create_pieces()
         self.update()
 
         self.animating = False
         self.root.after(800, self.autoplay)
 
         self.root.mainloop()
+        self.worker.shutdown(wait=False, cancel_futures=True)
+
+    def select_bot(self, p):
+        self.bots[p] = make_bot(self.bot_classes[self.bot_vars[p].get()])
+
+    def square_center(self, sq):
+        r,c = BOARD_COORDS[sq]
+        return c*CELL + CELL/2, r*CELL + CELL/2
 
     def draw_board(self):
-        self.canvas.delete("all")
+        rules = self.game.rules
         for sq,(r,c) in BOARD_COORDS.items():
             x1 = c*CELL
             y1 = r*CELL
@@ -53,33 +78,49 @@ class UrGUI:
             y2 = y1+CELL
 
             color = "burlywood2"
-            if sq in ROSETTES:
+            if sq in rules.rosettes:
                 color = "gold"
-            if sq in SAFE_SQUARES:
+            if sq in rules.safe_squares:
                 color = "orange"
-
             self.canvas.create_rectangle(x1,y1,x2,y2,fill=color,outline="black")
             self.canvas.create_text(x1+4,y1+4,anchor="nw",text=str(sq),font=("Arial",8))
 
+    def create_pieces(self):
+        # one (oval, label) pair per piece, hidden while off the board
+        self.piece_items = [[], []]
+        self.drawn_step = [[], []]
+        for p in [0,1]:
+            for idx in range(len(self.game.pos[p])):
+                oval = self.canvas.create_oval(0,0,28,28,fill=COLORS[p],outline="black",state="hidden")
+                label = self.canvas.create_text(14,14,text=str(idx),fill="white",
+                                                font=("Arial",10,"bold"),state="hidden")
+                self.piece_items[p].append((oval, label))
+                self.drawn_step[p].append(None)
+
+    def place_piece(self, p, idx, step):
+        oval, label = self.piece_items[p][idx]
+        if 0 <= step < self.game.rules.final_step:
+            x, y = self.square_center(self.game.path(p)[step])
+            self.canvas.coords(oval, x-14, y-14, x+14, y+14)
+            self.canvas.coords(label, x, y)
+            self.canvas.itemconfigure(oval, state="normal")
+            self.canvas.itemconfigure(label, state="normal")
+            self.canvas.tag_raise(oval)
+            self.canvas.tag_raise(label)
+        else:
+            self.canvas.itemconfigure(oval, state="hidden")
+            self.canvas.itemconfigure(label, state="hidden")
+        self.drawn_step[p][idx] = step
+
     def draw_pieces(self):
+        # only touch pieces whose position changed since the last frame
         for p in [0,1]:
-            color = "red" if p==0 else "blue"
-            text_color = "white"
             for idx, sp in enumerate(self.game.pos[p]):
-                if 0 <= sp < FINAL_STEP:
-                    sq = self.game.path(p)[sp]
-                    r,c = BOARD_COORDS[sq]
-                    x = c*CELL + CELL/2
-                    y = r*CELL + CELL/2
-
-                    # piece circle
-                    self.canvas.create_oval(x-14,y-14,x+14,y+14,fill=color,outline="black")
-
-                    # piece index number
-                    self.canvas.create_text(x, y, text=str(idx), fill=text_color, font=("Arial",10,"bold"))
+                if self.drawn_step[p][idx] != sp:
+                    self.place_piece(p, idx, sp)
 
     def autoplay(self):
-        if self.animating:
+        if self.animating or self.pending is not None:
             return
 
         if self.game.winner is not None:
@@ -96,8 +137,19 @@ class UrGUI:
             self.root.after(400, self.autoplay)
             return
 
-        bot = BOT1 if self.game.turn == 0 else BOT2
-        piece = bot.choose(self.game, roll)
+        bot = self.bots[self.game.turn]
+        self.info.config(text=f"Player {self.game.turn+1} rolled {roll} — thinking...")
+        # the bot gets its own copy, so the Tk thread never shares state with it
+        self.pending = (self.worker.submit(bot.choose, self.game.clone(), roll), roll)
+        self.root.after(20, self.poll_bot)
+
+    def poll_bot(self):
+        fut, roll = self.pending
+        if not fut.done():
+            self.root.after(20, self.poll_bot)
+            return
+        self.pending = None
+        piece = fut.result()
 
         # start animation
         self.animating = True
@@ -106,7 +158,6 @@ class UrGUI:
     def animate_move(self, piece, roll, step):
         p = self.game.turn
         start_step = self.game.pos[p][piece]
-        target_step = start_step + roll
 
         if step > roll:
             # finalize move in engine
@@ -118,24 +169,12 @@ class UrGUI:
 
         # temporarily move piece visually
         temp_step = start_step + step
-        path = self.game.path(p)
-        if temp_step < FINAL_STEP:
-            sq = path[temp_step]
-            r,c = BOARD_COORDS[sq]
-
-            self.draw_board()
-            self.draw_pieces()
-
-            # draw moving piece on top
-            x = c*CELL + CELL/2
-            y = r*CELL + CELL/2
-            color = "red" if p==0 else "blue"
-            self.canvas.create_oval(x-14,y-14,x+14,y+14,fill=color)
+        if temp_step < self.game.rules.final_step:
+            self.place_piece(p, piece, temp_step)
 
         self.root.after(150, lambda: self.animate_move(piece, roll, step+1))
 
     def update(self):
-        self.draw_board()
         self.draw_pieces()
         self.info.config(text=f"Player {self.game.turn+1}'s turn")
 
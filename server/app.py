@@ -0,0 +1,221 @@
+# server/app.py
+"""
+Asyncio match server: many concurrent UrGame sessions against the bots.
+
+Protocol: newline-delimited JSON over TCP, one request -> one response.
+
+    {"op": "new", "bot": "greedy_bot", "seat": 0, "rules": "classic"}
+    {"op": "move", "game": 1, "piece": 3}
+    {"op": "state", "game": 1}
+    {"op": "resume", "game": 1}
+    {"op": "close", "game": 1}
+    {"op": "choose", "bot": "a_expectimax2", "pos": [[...], [...]], "turn": 0, "roll": 2}
+    {"op": "stats"}
+
+The server rolls the dice. After "new" and "move" it plays the bot's turns
+(and any forced passes) until it is the client's turn again, then returns
+the state including the client's roll, legal moves and the bot's plies.
+
+All decisions go through server.decisions.DecisionService, which caches
+and de-duplicates them. Cheap bots run inline on the event loop; bots in
+HEAVY_BOTS run in a process pool, batched when they support it. Offloaded
+decisions time out after `timeout` seconds (the bot then plays a random
+legal move and the reply says so), and when more than `max_pending`
+decisions are queued new requests get a "busy" error instead of piling up.
+A "busy" reply to "move" or "resume" leaves the session waiting on the
+bot's turn with its roll kept; "resume" retries it. A "new" that fails
+opens no session.
+
+    python -m server.app --port 8765 --workers 4
+"""
+import argparse
+import asyncio
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from ur.game import UrGame
+from ur.rules import DEFAULT_RULES, get_rules
+from server.decisions import DecisionService, Busy, get_bot, make_game
+
+HEAVY_BOTS = {"a_expectimax1", "a_expectimax2", "a_expectimax2_sparse"}
+
+
+# ---------------------------
+# Sessions
+# ---------------------------
+
+class Session:
+    def __init__(self, gid, bot, seat, rules):
+        self.id = gid
+        self.bot = bot
+        self.seat = seat
+        self.game = UrGame(rules)
+        self.roll = None
+        # a bot turn interrupted by Busy: its roll and the plies played before it
+        self.bot_roll = None
+        self.plies = []
+        self.lock = asyncio.Lock()
+
+    def state(self, bot_plies=(), **extra):
+        g = self.game
+        return {
+            "ok": True,
+            "game": self.id,
+            "pos": g.pos,
+            "turn": g.turn,
+            "winner": g.winner,
+            "roll": self.roll,
+            "moves": g.legal_moves(self.roll) if self.roll is not None else [],
+            "bot_plies": list(bot_plies),
+            **extra,
+        }
+
+
+class MatchServer:
+    def __init__(self, workers=2, timeout=5.0, max_pending=64, heavy=HEAVY_BOTS, **service):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.decisions = DecisionService(self.pool, heavy, timeout, max_pending, **service)
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.requests = 0
+
+    async def advance(self, s):
+        """Play bot turns and passes until the client has a move to make or the game ends."""
+        g = s.game
+        plies, s.plies = s.plies, []
+        timed_out = False
+        while g.winner is None:
+            roll = g.roll_dice() if s.bot_roll is None else s.bot_roll
+            s.bot_roll = None
+            moves = g.legal_moves(roll)
+            if not moves:
+                plies.append((g.turn, roll, None))
+                g.turn = 1 - g.turn
+                continue
+            if g.turn == s.seat:
+                s.roll = roll
+                return plies, timed_out
+            try:
+                move, late = await self.decisions.decide(s.bot, g, roll)
+            except Busy:
+                s.bot_roll = roll
+                s.plies = plies
+                raise
+            timed_out = timed_out or late
+            plies.append((g.turn, roll, move))
+            g.play_move(move, roll)
+        s.roll = None
+        return plies, timed_out
+
+    # ---- ops ----
+
+    async def op_new(self, req):
+        bot = req["bot"]
+        get_bot(bot)  # fail early on unknown names
+        rules = get_rules(req["rules"]) if "rules" in req else DEFAULT_RULES
+        s = Session(next(self.ids), bot, int(req.get("seat", 0)), rules)
+        self.sessions[s.id] = s
+        try:
+            async with s.lock:
+                plies, late = await self.advance(s)
+                return s.state(plies, timed_out=late)
+        except BaseException:
+            del self.sessions[s.id]
+            raise
+
+    async def op_move(self, req):
+        s = self.sessions[req["game"]]
+        async with s.lock:
+            piece = req["piece"]
+            if s.roll is None or piece not in s.game.legal_moves(s.roll):
+                return {**s.state(), "ok": False, "error": "illegal move"}
+            s.game.play_move(piece, s.roll)
+            s.roll = None
+            plies, late = await self.advance(s)
+            return s.state(plies, timed_out=late)
+
+    async def op_resume(self, req):
+        s = self.sessions[req["game"]]
+        async with s.lock:
+            if s.roll is not None or s.game.winner is not None:
+                return s.state()
+            plies, late = await self.advance(s)
+            return s.state(plies, timed_out=late)
+
+    async def op_state(self, req):
+        return self.sessions[req["game"]].state()
+
+    async def op_close(self, req):
+        self.sessions.pop(req["game"], None)
+        return {"ok": True}
+
+    async def op_choose(self, req):
+        game = make_game(req.get("rules", DEFAULT_RULES.name), req["pos"], req["turn"])
+        move, late = await self.decisions.decide(req["bot"], game, req["roll"])
+        return {"ok": True, "move": move, "timed_out": late}
+
+    async def op_stats(self, req):
+        return {"ok": True, "sessions": len(self.sessions), "requests": self.requests,
+                **self.decisions.stats()}
+
+    async def handle(self, req):
+        self.requests += 1
+        op = getattr(self, f"op_{req.get('op')}", None)
+        if op is None:
+            return {"ok": False, "error": f"unknown op {req.get('op')!r}"}
+        try:
+            return await op(req)
+        except Busy:
+            return {"ok": False, "error": "busy"}
+        except Exception as e:
+            # bad input (unknown game, out-of-range piece or position, ...)
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    # ---- transport ----
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    req = json.loads(line)
+                except json.JSONDecodeError:
+                    resp = {"ok": False, "error": "bad json"}
+                else:
+                    resp = await self.handle(req)
+                writer.write(json.dumps(resp).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.serve_client, host, port)
+        print(f"Serving on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ur bot match server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+
+    srv = MatchServer(args.workers, args.timeout, args.max_pending)
+    try:
+        asyncio.run(srv.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.close()
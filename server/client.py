@@ -0,0 +1,131 @@
+# server/client.py
+"""
+Stand-in client for load testing server/app.py: opens many concurrent
+sessions, plays random legal moves, and reports request latency.
+
+A "busy" reply is retried with exponential backoff ("new" is sent again,
+a game in progress is resumed). Busy round-trips are counted and timed on
+their own, so the latency summary covers only served requests.
+
+    python -m server.client --bot greedy_bot --games 100 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from tournament.latency import LatencyHistogram
+
+# backoff between retries after "busy": doubles from BACKOFF up to
+# MAX_BACKOFF, and a request is given up after BUSY_RETRIES busy replies
+BACKOFF = 0.01
+MAX_BACKOFF = 0.5
+BUSY_RETRIES = 100
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, **req):
+        self.writer.write(json.dumps(req).encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_one(client, bot, rules, hist, busy_hist, results):
+    seat = random.randint(0, 1)
+    req = {"op": "new", "bot": bot, "seat": seat}
+    if rules:
+        req["rules"] = rules
+    retries = 0
+    while True:
+        t0 = time.perf_counter()
+        state = await client.request(**req)
+        dt = time.perf_counter() - t0
+        if not state["ok"] and state["error"] == "busy" and retries < BUSY_RETRIES:
+            # nothing was served: a busy "new" opened no game, and a busy
+            # move left the bot's turn unplayed; retry either after a backoff
+            busy_hist.record(dt)
+            await asyncio.sleep(min(BACKOFF * 2 ** retries, MAX_BACKOFF))
+            retries += 1
+            if "game" in req:
+                req = {"op": "resume", "game": req["game"]}
+            continue
+        hist.record(dt)
+        retries = 0
+        if not state["ok"]:
+            results["errors"][state["error"]] = results["errors"].get(state["error"], 0) + 1
+            if "game" in req:
+                await client.request(op="close", game=req["game"])
+            return
+        if state.get("timed_out"):
+            results["timeouts"] += 1
+        if state["winner"] is not None:
+            results["games"] += 1
+            results["client_wins"] += state["winner"] == seat
+            await client.request(op="close", game=state["game"])
+            return
+        req = {"op": "move", "game": state["game"], "piece": random.choice(state["moves"])}
+
+
+async def worker(args, queue, hist, busy_hist, results):
+    client = await Client.connect(args.host, args.port)
+    try:
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await play_one(client, args.bot, args.rules, hist, busy_hist, results)
+    finally:
+        await client.close()
+
+
+async def load_test(args):
+    queue = asyncio.Queue()
+    for i in range(args.games):
+        queue.put_nowait(i)
+    hist = LatencyHistogram()
+    busy_hist = LatencyHistogram()
+    results = {"games": 0, "client_wins": 0, "timeouts": 0, "errors": {}}
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(args, queue, hist, busy_hist, results)
+                           for _ in range(args.concurrency)))
+    dt = time.perf_counter() - t0
+
+    client = await Client.connect(args.host, args.port)
+    server_stats = await client.request(op="stats")
+    await client.close()
+
+    print(f"{results['games']} games in {dt:.1f}s ({results['games'] / dt:.2f} games/s)")
+    print("client wins:", results["client_wins"], "timeouts:", results["timeouts"],
+          "errors:", results["errors"])
+    print("request latency:", {k: round(v, 6) for k, v in hist.summary().items()})
+    if busy_hist.total:
+        print("busy replies:", {k: round(v, 6) for k, v in busy_hist.summary().items()})
+    print("server:", server_stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the Ur match server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bot", default="random_bot")
+    parser.add_argument("--rules", default=None)
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(load_test(args))
@@ -0,0 +1,250 @@
+# server/decisions.py
+"""
+Decision service in front of the bots.
+
+- Cache: decisions of deterministic bots are cached by position and roll
+  with LRU eviction and a TTL. The key is the canonical position plus the
+  first-occurrence order of the mover's distinct steps, which is all a
+  deterministic bot's tie-breaking can see, so a cached answer is the move
+  the bot would return for the exact position asked.
+- De-duplication: identical requests that arrive while the first one is
+  still being computed wait for the same result.
+- Batching: offloaded bots that implement choose_batch(games, rolls) get
+  requests queued for up to `batch_window` seconds (or `batch_size` items)
+  and answered with one process-pool round-trip.
+"""
+import asyncio
+import random
+import time
+from collections import OrderedDict
+
+from ur.game import UrGame
+from ur.rules import get_rules
+
+# bots whose choose() does not use randomness
+DETERMINISTIC_BOTS = {
+    "greedy_bot", "progress_bot", "a_expectimax1", "a_expectimax2", "a_expectimax2_sparse",
+}
+
+
+# ---------------------------
+# Worker-side helpers
+# ---------------------------
+
+_bot_classes = None
+_bots = {}
+
+
+def get_bot(name):
+    """One bot instance per name and process (the repo's bots keep no per-game state)."""
+    global _bot_classes
+    if name not in _bots:
+        from evaluate import load_bots, make_bot
+        if _bot_classes is None:
+            _bot_classes = load_bots()
+        if name not in _bot_classes:
+            raise KeyError(f"unknown bot {name!r}")
+        _bots[name] = make_bot(_bot_classes[name])
+    return _bots[name]
+
+
+def make_game(rules_name, pos, turn):
+    game = UrGame(get_rules(rules_name))
+    game.pos = [list(pos[0]), list(pos[1])]
+    game.turn = turn
+    return game
+
+
+def choose_move(bot_name, rules_name, pos, turn, roll):
+    """Pure function of the position, so it can run in any process."""
+    return get_bot(bot_name).choose(make_game(rules_name, pos, turn), roll)
+
+
+def choose_moves(bot_name, items):
+    """items: [(rules_name, pos, turn, roll)]; uses choose_batch when the bot has it."""
+    bot = get_bot(bot_name)
+    games = [make_game(rn, pos, turn) for rn, pos, turn, _ in items]
+    rolls = [roll for _, _, _, roll in items]
+    if hasattr(bot, "choose_batch"):
+        return bot.choose_batch(games, rolls)
+    return [bot.choose(g, r) for g, r in zip(games, rolls)]
+
+
+def decision_key(bot, game, roll):
+    mover = game.pos[game.turn]
+    return (bot, game.rules.name, game.canonical_key(), roll, tuple(dict.fromkeys(mover)))
+
+
+class Busy(Exception):
+    pass
+
+
+# ---------------------------
+# Service
+# ---------------------------
+
+class DecisionService:
+    def __init__(self, pool, heavy, timeout=5.0, max_pending=64,
+                 cache_size=100_000, ttl=3600.0, batch_size=16, batch_window=0.002,
+                 deterministic=DETERMINISTIC_BOTS):
+        self.pool = pool
+        self.heavy = set(heavy)
+        self.deterministic = set(deterministic)
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+
+        self.cache = OrderedDict()  # key -> (from_step, expires_at)
+        self.inflight = {}          # key -> future
+        self.batches = {}           # bot -> [(item, future)]
+        self.batching = {}          # bot -> supports choose_batch
+        self.pending = 0
+        self.counters = {
+            "decisions": 0, "cache_hits": 0, "deduplicated": 0, "offloaded": 0,
+            "batches": 0, "timeouts": 0, "busy": 0,
+        }
+
+    # ---- cache ----
+
+    def cache_get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        step, expires = entry
+        if expires < time.monotonic():
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return step
+
+    def cache_put(self, key, step):
+        self.cache[key] = (step, time.monotonic() + self.ttl)
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    # ---- computing ----
+
+    def supports_batching(self, bot):
+        if bot not in self.batching:
+            self.batching[bot] = hasattr(get_bot(bot), "choose_batch")
+        return self.batching[bot]
+
+    async def compute(self, bot, game, roll):
+        pos = [game.pos[0][:], game.pos[1][:]]
+        if bot not in self.heavy:
+            return choose_move(bot, game.rules.name, pos, game.turn, roll)
+
+        self.counters["offloaded"] += 1
+        loop = asyncio.get_running_loop()
+        item = (game.rules.name, pos, game.turn, roll)
+        if not self.supports_batching(bot):
+            return await loop.run_in_executor(self.pool, choose_move, bot, *item)
+
+        fut = loop.create_future()
+        batch = self.batches.setdefault(bot, [])
+        batch.append((item, fut))
+        if len(batch) == 1:
+            loop.call_later(self.batch_window, self.flush, bot)
+        elif len(batch) >= self.batch_size:
+            self.flush(bot)
+        return await fut
+
+    def flush(self, bot):
+        batch = self.batches.pop(bot, None)
+        if not batch:
+            return
+        self.counters["batches"] += 1
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self.pool, choose_moves, bot, [item for item, _ in batch])
+
+        def done(job):
+            for i, (_, fut) in enumerate(batch):
+                if fut.done():
+                    continue
+                if job.exception() is not None:
+                    fut.set_exception(job.exception())
+                else:
+                    fut.set_result(job.result()[i])
+        job.add_done_callback(done)
+
+    # ---- public ----
+
+    async def decide(self, bot, game, roll):
+        """
+        Return (move, timed_out) for the player to move in `game`; move is
+        None when the roll leaves no legal move.
+        """
+        self.counters["decisions"] += 1
+        moves = game.legal_moves(roll)
+        if not moves:
+            return None, False
+        cacheable = bot in self.deterministic
+        heavy = bot in self.heavy
+        key = decision_key(bot, game, roll) if cacheable else None
+        # copy: a timed-out computation finishes after the game has moved on
+        mover = game.pos[game.turn][:]
+
+        if cacheable:
+            step = self.cache_get(key)
+            if step is not None:
+                self.counters["cache_hits"] += 1
+                return mover.index(step), False
+            if key in self.inflight:
+                self.counters["deduplicated"] += 1
+                return await self.wait(self.inflight[key], mover, moves, heavy)
+
+        if heavy and self.pending >= self.max_pending:
+            self.counters["busy"] += 1
+            raise Busy()
+
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(self.compute(bot, game, roll))
+        step_fut = loop.create_future()
+        if cacheable:
+            self.inflight[key] = step_fut
+        if heavy:
+            # released when the work finishes, not when a caller stops waiting
+            self.pending += 1
+
+        def finished(task):
+            if cacheable:
+                self.inflight.pop(key, None)
+            if heavy:
+                self.pending -= 1
+            if task.cancelled():
+                step_fut.cancel()
+                return
+            try:
+                move = task.result()
+                step = None if move is None else mover[move]
+            except Exception as e:
+                if not step_fut.done():
+                    step_fut.set_exception(e)
+                return
+            if cacheable and step is not None:
+                self.cache_put(key, step)
+            if not step_fut.done():
+                step_fut.set_result(step)
+        task.add_done_callback(finished)
+
+        return await self.wait(step_fut, mover, moves, heavy)
+
+    async def wait(self, step_fut, mover, moves, timed):
+        """Wait for a decision; offloaded ones fall back to a random move after `timeout`."""
+        if not timed:
+            step = await asyncio.shield(step_fut)
+        else:
+            try:
+                step = await asyncio.wait_for(asyncio.shield(step_fut), self.timeout)
+            except asyncio.TimeoutError:
+                # the computation keeps running and still fills the cache
+                self.counters["timeouts"] += 1
+                return random.choice(moves), True
+        return (None if step is None else mover.index(step)), False
+
+    def stats(self):
+        return {"cache_size": len(self.cache), "pending": self.pending, **self.counters}
@@ -0,0 +1,63 @@
+# tests/test_race.py
+import time
+
+import pytest
+
+from ur.game import UrGame
+from ur.race import RaceTable
+from ur.rules import get_rules
+from bots.a_expectimax1 import Expectimax1Bot
+
+
+def race(rules, pos0, pos1, turn=0):
+    game = UrGame(rules)
+    game.pos = [list(pos0), list(pos1)]
+    game.turn = turn
+    return game
+
+
+def test_worst_50_piece_race_is_refused_cheaply():
+    rules = get_rules("default")
+    n = rules.pieces
+    game = race(rules, [13] * (n - 2) + [11, 12], [-1] * n)
+    table = RaceTable(rules)
+
+    assert table.is_race(game)
+    assert table.pair_bound(game) == 1_458_176
+    assert not table.solvable(game)
+    with pytest.raises(ValueError):
+        table.win_prob(game)
+
+    # the bot falls back to its normal search instead of stalling on the table
+    bot = Expectimax1Bot(race=True)
+    t0 = time.perf_counter()
+    assert bot.choose(game, 2) in game.legal_moves(2)
+    assert time.perf_counter() - t0 < 2.0
+    assert len(RaceTable.shared(rules)) == 0
+
+
+def test_largest_solvable_race_stays_inside_the_budget():
+    rules = get_rules("default")
+    n = rules.pieces
+    game = race(rules, [13] * (n - 2) + [11, 12], [-1] * 13 + [13] * (n - 13))
+    table = RaceTable(rules)
+
+    assert table.solvable(game)
+    bound = table.pair_bound(game)
+    assert bound <= table.max_pairs
+    t0 = time.perf_counter()
+    p = table.win_prob(game)
+    assert time.perf_counter() - t0 < 5.0
+    assert 0.0 < p < 1.0
+    assert len(table) <= bound
+
+
+def test_pair_bound_covers_the_reachable_states():
+    rules = get_rules("classic")
+    table = RaceTable(rules)
+    game = race(rules, [-1, -1, 0, 3, 7, 12, 13], [12, 13, 13, 13, 13, 13, 13])
+    sides = [table.side(game.pos[p]) for p in (0, 1)]
+    for p in (0, 1):
+        assert len(table.reach(p, sides[p])) <= table.state_bound(sides[p])
+    table.win_prob(game)
+    assert len(table) <= table.pair_bound(game)
@@ -0,0 +1,175 @@
+# tournament/aggregate.py
+"""
+Streaming tournament aggregation.
+
+StreamingAggregator is updated once per game and keeps only per-pair win
+counts, per-bot totals and the fixed-size timing entries, so its memory
+does not grow with the number of games. Every `flush_every` seconds it
+writes live_progress.json plus live_*.csv files (atomically, via a temp
+file) so a multi-hour run can be watched and a crash loses nothing that
+was flushed. Plots are rendered on demand from a snapshot:
+
+    python -m tournament.aggregate live_progress.json
+"""
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+
+def _write_atomic(path, write):
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "w", newline="") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class StreamingAggregator:
+    def __init__(self, names, timing_stats, out_dir=".", flush_every=30.0, prefix="live_"):
+        self.names = list(names)
+        self.timing_stats = timing_stats
+        self.out_dir = Path(out_dir)
+        self.flush_every = flush_every
+        self.prefix = prefix
+
+        M = len(self.names)
+        self.pairs = [(i, j) for i in range(M) for j in range(i + 1, M)]
+        self.wins = {pair: 0 for pair in self.pairs}
+        self.played = {pair: 0 for pair in self.pairs}
+        self.games = 0
+        self.started = time.time()
+        self.last_flush = time.monotonic()
+
+    # ---------------------------
+    # Updates
+    # ---------------------------
+
+    def add(self, i, j, a_won):
+        """Record one game of pair (i, j), i < j; a_won is True if names[i] won."""
+        if a_won:
+            self.wins[(i, j)] += 1
+        self.played[(i, j)] += 1
+        self.games += 1
+        if time.monotonic() - self.last_flush >= self.flush_every:
+            self.flush()
+
+    # ---------------------------
+    # Views
+    # ---------------------------
+
+    def overall(self):
+        wins = {n: 0 for n in self.names}
+        games = {n: 0 for n in self.names}
+        for (i, j), n in self.played.items():
+            w = self.wins[(i, j)]
+            wins[self.names[i]] += w
+            wins[self.names[j]] += n - w
+            games[self.names[i]] += n
+            games[self.names[j]] += n
+        return wins, games
+
+    def pairwise_rows(self):
+        """Row-beats-column win rates as nested lists, None where nothing was played."""
+        M = len(self.names)
+        rows = [[None] * M for _ in range(M)]
+        for (i, j), n in self.played.items():
+            if n:
+                rows[i][j] = self.wins[(i, j)] / n
+                rows[j][i] = (n - self.wins[(i, j)]) / n
+        return rows
+
+    def results(self):
+        """The (names, overall_wins, overall_games, pairwise, timing_stats) tuple for save_results."""
+        import numpy as np
+
+        wins, games = self.overall()
+        pairwise = np.array(self.pairwise_rows(), dtype=float)
+        return self.names, wins, games, pairwise, self.timing_stats
+
+    def snapshot(self):
+        wins, games = self.overall()
+        timing = {}
+        for n in self.names:
+            entry = self.timing_stats[n]
+            timing[n] = {"time": entry["time"], "calls": entry["calls"]}
+            if "hist" in entry and entry["hist"].total:
+                timing[n].update(entry["hist"].summary())
+        return {
+            "started": self.started,
+            "updated": time.time(),
+            "games": self.games,
+            "names": self.names,
+            "pairs": [[self.names[i], self.names[j], self.wins[(i, j)], self.played[(i, j)]]
+                      for i, j in self.pairs],
+            "overall": {n: {"wins": wins[n], "games": games[n]} for n in self.names},
+            "timing": timing,
+        }
+
+    # ---------------------------
+    # Output
+    # ---------------------------
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        snap = self.snapshot()
+
+        def progress(f):
+            json.dump(snap, f, indent=1)
+
+        def overall(f):
+            w = csv.writer(f)
+            w.writerow(["bot", "wins", "games", "winrate"])
+            rows = [(n, o["wins"], o["games"], o["wins"] / o["games"] if o["games"] else 0.0)
+                    for n, o in snap["overall"].items()]
+            w.writerows(sorted(rows, key=lambda r: r[3], reverse=True))
+
+        def pairwise(f):
+            w = csv.writer(f)
+            w.writerow([""] + self.names)
+            for n, row in zip(self.names, self.pairwise_rows()):
+                w.writerow([n] + ["" if v is None else v for v in row])
+
+        def timings(f):
+            w = csv.writer(f)
+            w.writerow(["bot", "calls", "total_time_sec", "avg_time_per_call_sec",
+                        "p50_sec", "p90_sec", "p99_sec", "max_sec"])
+            for n, t in snap["timing"].items():
+                avg = t["time"] / t["calls"] if t["calls"] else 0.0
+                w.writerow([n, t["calls"], t["time"], avg,
+                            t.get("p50", ""), t.get("p90", ""), t.get("p99", ""), t.get("max", "")])
+
+        _write_atomic(self.out_dir / f"{self.prefix}progress.json", progress)
+        _write_atomic(self.out_dir / f"{self.prefix}overall_winrates.csv", overall)
+        _write_atomic(self.out_dir / f"{self.prefix}pairwise_matrix.csv", pairwise)
+        _write_atomic(self.out_dir / f"{self.prefix}bot_timings.csv", timings)
+
+
+def load_snapshot(path):
+    """Turn a live_progress.json back into the save_results tuple (timing totals only)."""
+    from collections import defaultdict
+    from tournament.latency import new_timing_entry
+
+    with open(path) as f:
+        snap = json.load(f)
+    timing_stats = defaultdict(new_timing_entry)
+    for n, t in snap["timing"].items():
+        timing_stats[n]["time"] = t["time"]
+        timing_stats[n]["calls"] = t["calls"]
+
+    agg = StreamingAggregator(snap["names"], timing_stats)
+    index = {n: i for i, n in enumerate(agg.names)}
+    for a, b, w, n in snap["pairs"]:
+        i, j = index[a], index[b]
+        agg.wins[(i, j)] = w
+        agg.played[(i, j)] = n
+    agg.games = snap["games"]
+    return agg.results()
+
+
+if __name__ == "__main__":
+    from evaluate import save_results
+
+    save_results(*load_snapshot(sys.argv[1] if len(sys.argv) > 1 else "live_progress.json"))
@@ -0,0 +1,116 @@
+# tournament/latency.py
+"""
+Fixed-memory latency histograms (HDR-style) for per-decision timing.
+
+Latencies are recorded in whole microseconds into log-linear buckets:
+values below 2**SUB_BITS are exact, larger values keep SUB_BITS-1
+significant bits, i.e. a relative error under 1/64 with the defaults.
+"""
+from array import array
+
+SUB_BITS = 7
+MAX_SECONDS = 100.0
+
+# legal-move counts are grouped so the breakdown stays a fixed size
+MOVE_BINS = [(1, 1), (2, 2), (3, 3), (4, 4), (5, 8), (9, 16), (17, 32), (33, None)]
+
+
+def move_bin(n_moves):
+    for lo, hi in MOVE_BINS:
+        if hi is None or n_moves <= hi:
+            return f"{lo}+" if hi is None else (str(lo) if lo == hi else f"{lo}-{hi}")
+    return "0"
+
+
+class LatencyHistogram:
+    def __init__(self, sub_bits=SUB_BITS, max_seconds=MAX_SECONDS):
+        self.sub_count = 1 << sub_bits
+        self.half = self.sub_count // 2
+        self.max_us = int(max_seconds * 1e6)
+        self.counts = array("Q", [0] * (self._index(self.max_us) + 1))
+        self.total = 0
+        self.sum_us = 0
+        self.max_value = 0
+
+    def _index(self, v):
+        if v < self.sub_count:
+            return v
+        shift = v.bit_length() - (self.sub_count.bit_length() - 1)
+        return self.sub_count + (shift - 1) * self.half + ((v >> shift) - self.half)
+
+    def _upper(self, idx):
+        """Largest value that falls into bucket idx."""
+        if idx < self.sub_count:
+            return idx
+        shift, sub = divmod(idx - self.sub_count, self.half)
+        shift += 1
+        return ((sub + self.half + 1) << shift) - 1
+
+    def record(self, seconds):
+        v = min(int(seconds * 1e6), self.max_us)
+        self.counts[self._index(v)] += 1
+        self.total += 1
+        self.sum_us += v
+        if v > self.max_value:
+            self.max_value = v
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.max_value = max(self.max_value, other.max_value)
+
+    def percentile(self, q):
+        """Latency in seconds at percentile q (0..100)."""
+        if self.total == 0:
+            return 0.0
+        target = max(1, int(q / 100 * self.total + 0.5))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(self._upper(i), self.max_value) / 1e6
+        return self.max_value / 1e6
+
+    def mean(self):
+        return self.sum_us / self.total / 1e6 if self.total else 0.0
+
+    def summary(self):
+        return {
+            "calls": self.total,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max_value / 1e6,
+        }
+
+
+def new_timing_entry():
+    """Per-bot timing record: totals plus overall and per-move-count histograms."""
+    return {"time": 0.0, "calls": 0, "hist": LatencyHistogram(), "by_moves": {}}
+
+
+def record_latency(entry, seconds, n_moves):
+    entry["hist"].record(seconds)
+    key = move_bin(n_moves)
+    if key not in entry["by_moves"]:
+        entry["by_moves"][key] = LatencyHistogram()
+    entry["by_moves"][key].record(seconds)
+
+
+def latency_rows(timing_stats, names):
+    """Rows of (bot, moves, calls, p50, p90, p99, max); moves is "all" or a move-count bin."""
+    order = {move_bin(lo): i for i, (lo, _) in enumerate(MOVE_BINS)}
+    rows = []
+    for n in names:
+        entry = timing_stats[n]
+        if "hist" not in entry or entry["hist"].total == 0:
+            continue
+        s = entry["hist"].summary()
+        rows.append([n, "all", s["calls"], s["p50"], s["p90"], s["p99"], s["max"]])
+        for key in sorted(entry["by_moves"], key=order.get):
+            s = entry["by_moves"][key].summary()
+            rows.append([n, key, s["calls"], s["p50"], s["p90"], s["p99"], s["max"]])
+    return rows
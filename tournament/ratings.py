@@ -0,0 +1,180 @@
+# tournament/ratings.py
+"""
+Bradley-Terry ratings for the bot ladder, reported on the Elo scale.
+
+Game results are stored as win counts per pair and persisted to a JSON file
+together with the last fitted ratings, so the ladder grows incrementally:
+a new bot only plays a few calibration games against anchor bots and is
+then slotted in by refitting, instead of rerunning the whole round-robin.
+"""
+import json
+import math
+from pathlib import Path
+
+ELO_SCALE = 400 / math.log(10)  # natural-log strength -> Elo points
+
+RATINGS_FILE = Path("ratings.json")
+
+
+class RatingLadder:
+    def __init__(self):
+        # (a, b) with a < b  ->  [wins of a, games played]
+        self.results = {}
+        # name -> {"elo": float, "se": float, "games": int}
+        self.ratings = {}
+
+    # ---------------------------
+    # Results
+    # ---------------------------
+
+    def record_pair(self, a, b, wins_a, games):
+        """Add `games` results between a and b, of which a won `wins_a`."""
+        if a == b or games == 0:
+            return
+        if a > b:
+            a, b = b, a
+            wins_a = games - wins_a
+        entry = self.results.setdefault((a, b), [0, 0])
+        entry[0] += wins_a
+        entry[1] += games
+
+    def record(self, a, b, a_won):
+        self.record_pair(a, b, 1 if a_won else 0, 1)
+
+    def players(self):
+        names = set()
+        for a, b in self.results:
+            names.add(a)
+            names.add(b)
+        return sorted(names)
+
+    def games_played(self, name):
+        return sum(n for (a, b), (_, n) in self.results.items() if name in (a, b))
+
+    # ---------------------------
+    # Fitting
+    # ---------------------------
+
+    def fit(self, prior_games=1.0, iters=1000, tol=1e-9):
+        """
+        Fit Bradley-Terry strengths with the MM algorithm (Hunter 2004).
+
+        Every bot also gets prior_games wins and losses against a virtual
+        player of strength 1 (Elo 0); this keeps undefeated or winless bots
+        finite and pins the scale. Standard errors come from the diagonal of
+        the Fisher information.
+        """
+        names = self.players()
+        gamma = {n: 1.0 for n in names}
+
+        wins = {n: prior_games for n in names}
+        opponents = {n: [] for n in names}
+        for (a, b), (wa, games) in self.results.items():
+            wins[a] += wa
+            wins[b] += games - wa
+            opponents[a].append((b, games))
+            opponents[b].append((a, games))
+
+        for _ in range(iters):
+            delta = 0.0
+            new = {}
+            for n in names:
+                denom = 2 * prior_games / (gamma[n] + 1.0)
+                for o, games in opponents[n]:
+                    denom += games / (gamma[n] + gamma[o])
+                new[n] = wins[n] / denom
+                delta = max(delta, abs(math.log(new[n] / gamma[n])))
+            gamma = new
+            if delta < tol:
+                break
+
+        self.ratings = {}
+        for n in names:
+            p0 = gamma[n] / (gamma[n] + 1.0)
+            info = 2 * prior_games * p0 * (1 - p0)
+            for o, games in opponents[n]:
+                p = gamma[n] / (gamma[n] + gamma[o])
+                info += games * p * (1 - p)
+            self.ratings[n] = {
+                "elo": ELO_SCALE * math.log(gamma[n]),
+                "se": ELO_SCALE / math.sqrt(info),
+                "games": self.games_played(n),
+            }
+        return self.ratings
+
+    def interval(self, name, z=1.96):
+        r = self.ratings[name]
+        return r["elo"] - z * r["se"], r["elo"] + z * r["se"]
+
+    def table(self, z=1.96):
+        """Rows of (bot, elo, ci_low, ci_high, games), strongest first."""
+        rows = []
+        for n, r in self.ratings.items():
+            lo, hi = self.interval(n, z)
+            rows.append((n, r["elo"], lo, hi, r["games"]))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    # ---------------------------
+    # Calibration
+    # ---------------------------
+
+    def pick_anchors(self, k=3, exclude=()):
+        """k rated bots spread evenly across the current rating range."""
+        rated = sorted(
+            (n for n in self.ratings if n not in exclude),
+            key=lambda n: self.ratings[n]["elo"],
+        )
+        if len(rated) <= k:
+            return rated
+        if k == 1:
+            return [rated[len(rated) // 2]]
+        step = (len(rated) - 1) / (k - 1)
+        return [rated[round(i * step)] for i in range(k)]
+
+    def calibrate(self, name, play, anchors=3, games_per_anchor=10):
+        """
+        Rate a new bot from a few games against anchor bots.
+
+        play(name, anchor, k) plays game k of the pairing and returns True if
+        `name` won; k alternates the seats as in evaluate.play_pair_game.
+        Raises ValueError if the ladder has no rated bots to play against.
+        """
+        picked = self.pick_anchors(anchors, exclude=(name,))
+        if not picked:
+            raise ValueError("no anchors in ladder; run a full tournament first")
+        for anchor in picked:
+            wins = sum(bool(play(name, anchor, k)) for k in range(games_per_anchor))
+            self.record_pair(name, anchor, wins, games_per_anchor)
+        return self.fit()[name]
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+
+    def save(self, path=RATINGS_FILE):
+        data = {
+            "results": [[a, b, w, n] for (a, b), (w, n) in sorted(self.results.items())],
+            "ratings": self.ratings,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    @classmethod
+    def from_results(cls, rows):
+        """Build a ladder from (a, b, wins of a, games) rows, e.g. ResultStore.pair_counts()."""
+        ladder = cls()
+        for a, b, w, n in rows:
+            ladder.record_pair(a, b, w, n)
+        return ladder
+
+    @classmethod
+    def load(cls, path=RATINGS_FILE):
+        ladder = cls()
+        if Path(path).exists():
+            with open(path) as f:
+                data = json.load(f)
+            for a, b, w, n in data.get("results", []):
+                ladder.record_pair(a, b, w, n)
+            ladder.ratings = data.get("ratings", {})
+        return ladder
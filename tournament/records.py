@@ -0,0 +1,149 @@
+# tournament/records.py
+"""
+Compact binary game records.
+
+A record file starts with MAGIC and a version byte, followed by records:
+
+    seed     u64   seed the game was played with
+    pieces   u8    pieces per player
+    plies    u32   number of dice rolls
+    moves    plies bytes, one per roll
+
+Each ply byte is the roll itself (0..4) when no piece moved, or
+5 + 4 * piece + (roll - 1) when `piece` moved, so one byte covers up to
+62 pieces per player.
+"""
+import struct
+from array import array
+
+from ur.game import UrGame
+
+MAGIC = b"URGR"
+VERSION = 1
+
+HEADER = struct.Struct("<QBI")
+MAX_PIECES = (256 - 5) // 4
+
+
+def encode_ply(roll, piece):
+    if piece is None:
+        return roll
+    return 5 + 4 * piece + (roll - 1)
+
+
+def decode_ply(code):
+    """Return (roll, piece); piece is None for a pass."""
+    if code < 5:
+        return code, None
+    piece, r = divmod(code - 5, 4)
+    return r + 1, piece
+
+
+class RecordWriter:
+    """Append games to a record file; usable as a context manager."""
+
+    def __init__(self, path):
+        self.f = open(path, "ab")
+        if self.f.tell() == 0:
+            self.f.write(MAGIC + bytes([VERSION]))
+
+    def write(self, seed, plies, pieces=50):
+        """plies is a sequence of (roll, piece) as filled in by evaluate.play_game."""
+        if pieces > MAX_PIECES:
+            raise ValueError(f"record format supports at most {MAX_PIECES} pieces")
+        body = bytes(encode_ply(r, p) for r, p in plies)
+        self.f.write(HEADER.pack(seed or 0, pieces, len(body)))
+        self.f.write(body)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_records(path):
+    """Lazily yield (seed, pieces, ply_bytes) for every record in a file."""
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + 1)
+        if head[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a game record file")
+        if head[len(MAGIC)] != VERSION:
+            raise ValueError(f"unsupported record version {head[len(MAGIC)]}")
+        while True:
+            raw = f.read(HEADER.size)
+            if not raw:
+                return
+            seed, pieces, n = HEADER.unpack(raw)
+            yield seed, pieces, f.read(n)
+
+
+def replay(path, validate=False, rules=None):
+    """
+    Replay every record through UrGame, yielding (game_index, game, roll, piece)
+    just before each ply is applied. The same UrGame object is reused for the
+    whole game, so clone() it to keep a position. With validate=True each move
+    is checked against legal_moves. rules must be the variant the games were
+    played under.
+    """
+    for gi, (seed, pieces, body) in enumerate(read_records(path)):
+        game = UrGame(rules)
+        if len(game.pos[0]) != pieces:
+            raise ValueError(f"record {gi} has {pieces} pieces, engine has {len(game.pos[0])}")
+        for code in body:
+            roll, piece = decode_ply(code)
+            yield gi, game, roll, piece
+            if piece is None:
+                game.turn = 1 - game.turn
+                continue
+            if validate and piece not in game.legal_moves(roll):
+                raise ValueError(f"record {gi}: illegal move {piece} with roll {roll}")
+            game.play_move(piece, roll)
+
+
+def export_positions(path, limit=None, include_passes=False, rules=None):
+    """
+    Replay a record file into NumPy arrays of decision positions:
+
+        pos    (n, 2, pieces) int8   piece steps before the move
+        turn   (n,)           int8
+        roll   (n,)           int8
+        piece  (n,)           int8   -1 for passes
+        game   (n,)           int32  record index
+
+    limit caps the number of positions exported.
+    """
+    import numpy as np
+
+    pos = array("b")
+    turn = array("b")
+    rolls = array("b")
+    piece_arr = array("b")
+    games = array("i")
+    pieces = None
+
+    n = 0
+    for gi, game, roll, piece in replay(path, rules=rules):
+        if piece is None and not include_passes:
+            continue
+        if limit is not None and n >= limit:
+            break
+        pieces = len(game.pos[0])
+        pos.extend(game.pos[0])
+        pos.extend(game.pos[1])
+        turn.append(game.turn)
+        rolls.append(roll)
+        piece_arr.append(-1 if piece is None else piece)
+        games.append(gi)
+        n += 1
+
+    return {
+        "pos": np.frombuffer(pos, dtype=np.int8).reshape(n, 2, pieces or 0),
+        "turn": np.frombuffer(turn, dtype=np.int8),
+        "roll": np.frombuffer(rolls, dtype=np.int8),
+        "piece": np.frombuffer(piece_arr, dtype=np.int8),
+        "game": np.frombuffer(games, dtype=np.int32),
+    }
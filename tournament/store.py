@@ -0,0 +1,208 @@
+# tournament/store.py
+"""
+Append-only SQLite store with one row per tournament game.
+
+Games are identified by (result_set, bot0, version0, bot1, version1, seed),
+where bot0 is the bot in seat 0, version0 its version (see
+BotRegistry.version) and the seed drives the game's dice and bot randomness.
+A tournament that derives its seeds deterministically can therefore be
+resumed: games already in the store are looked up instead of replayed.
+
+A stored game is reused only when it is in the same result set and both bots
+still have the version they were played with; editing a bot's source changes
+its version, so its games are played again and its old games drop out of
+every report. Anything the version does not cover (retrained weights or
+books under trained/, other engine code) needs a new result set.
+"""
+import sqlite3
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+STORE_FILE = Path("results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id         INTEGER PRIMARY KEY,
+    run        TEXT,
+    result_set TEXT NOT NULL,
+    bot0       TEXT NOT NULL,
+    version0   TEXT NOT NULL,
+    bot1       TEXT NOT NULL,
+    version1   TEXT NOT NULL,
+    seed       INTEGER NOT NULL,
+    winner     INTEGER NOT NULL,
+    plies      INTEGER NOT NULL,
+    time0      REAL NOT NULL,
+    time1      REAL NOT NULL,
+    calls0     INTEGER NOT NULL,
+    calls1     INTEGER NOT NULL,
+    played_at  REAL NOT NULL,
+    UNIQUE (result_set, bot0, version0, bot1, version1, seed)
+)
+"""
+
+DEFAULT_SET = "main"
+
+# stores from before result sets and versions: their games keep their set
+# but get an empty version, which no current bot matches
+MIGRATE = """
+ALTER TABLE games RENAME TO games_old;
+{schema};
+INSERT INTO games (run, result_set, bot0, version0, bot1, version1, seed, winner, plies,
+                   time0, time1, calls0, calls1, played_at)
+    SELECT run, '{set}', bot0, '', bot1, '', seed, winner, plies,
+           time0, time1, calls0, calls1, played_at FROM games_old;
+DROP TABLE games_old;
+""".format(schema=SCHEMA.strip(), set=DEFAULT_SET)
+
+
+def game_seed(nameA, nameB, k, base_seed=0):
+    """Deterministic seed for game k of the A-vs-B pairing."""
+    return zlib.crc32(f"{base_seed}:{nameA}:{nameB}:{k}".encode())
+
+
+class ResultStore:
+    """
+    Games of one result set (default "main") in the store at path.
+
+    versions maps bot name -> version; games are stored with it and only
+    games whose bots still have these versions are read back. A bot missing
+    from versions matches any stored version.
+    """
+
+    def __init__(self, path=STORE_FILE, run=None, result_set=DEFAULT_SET, versions=None):
+        self.path = Path(path)
+        self.run = run or time.strftime("%Y%m%d-%H%M%S")
+        self.result_set = result_set
+        self.versions = dict(versions or {})
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = {r[1] for r in self.conn.execute("PRAGMA table_info(games)")}
+        if columns and "version0" not in columns:
+            self.conn.executescript(MIGRATE)
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ---------------------------
+    # Writing
+    # ---------------------------
+
+    def version(self, bot):
+        return self.versions.get(bot, "")
+
+    def add(self, bot0, bot1, seed, winner, plies, times, calls):
+        """Append one finished game; committed immediately so a crash loses at most it."""
+        self.conn.execute(
+            "INSERT OR IGNORE INTO games "
+            "(run, result_set, bot0, version0, bot1, version1, seed, winner, plies, "
+            "time0, time1, calls0, calls1, played_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.run, self.result_set, bot0, self.version(bot0), bot1, self.version(bot1),
+             seed, winner, plies, times[0], times[1], calls[0], calls[1], time.time()),
+        )
+        self.conn.commit()
+
+    # ---------------------------
+    # Reading
+    # ---------------------------
+
+    def current(self, bot, version):
+        """True if a game stored with this version of bot may be reused."""
+        return bot not in self.versions or self.versions[bot] == version
+
+    def get(self, bot0, bot1, seed):
+        """Return the stored row for a game as a dict, or None if not played yet."""
+        cur = self.conn.execute(
+            "SELECT winner, plies, time0, time1, calls0, calls1 FROM games "
+            "WHERE result_set = ? AND bot0 = ? AND version0 = ? "
+            "AND bot1 = ? AND version1 = ? AND seed = ?",
+            (self.result_set, bot0, self.version(bot0), bot1, self.version(bot1), seed),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        winner, plies, time0, time1, calls0, calls1 = row
+        return {
+            "winner": winner,
+            "plies": plies,
+            "times": (time0, time1),
+            "calls": (calls0, calls1),
+        }
+
+    def _winners(self):
+        """Yield (bot0, bot1, winner, games) over the current games of the result set."""
+        cur = self.conn.execute(
+            "SELECT bot0, version0, bot1, version1, winner, COUNT(*) FROM games "
+            "WHERE result_set = ? GROUP BY bot0, version0, bot1, version1, winner",
+            (self.result_set,),
+        )
+        for bot0, version0, bot1, version1, winner, n in cur:
+            if self.current(bot0, version0) and self.current(bot1, version1):
+                yield bot0, bot1, winner, n
+
+    def __len__(self):
+        return sum(row[-1] for row in self._winners())
+
+    def bots(self):
+        return sorted({name for row in self._winners() for name in row[:2]})
+
+    def pair_counts(self):
+        """Yield (a, b, wins of a, games) for every pair in the store, a < b."""
+        counts = defaultdict(lambda: [0, 0])
+        for bot0, bot1, winner, n in self._winners():
+            winner_name = bot0 if winner == 0 else bot1
+            a, b = sorted((bot0, bot1))
+            if winner_name == a:
+                counts[(a, b)][0] += n
+            counts[(a, b)][1] += n
+        for (a, b), (w, n) in sorted(counts.items()):
+            yield a, b, w, n
+
+    def timing(self):
+        """Per-bot think-time totals in the shape evaluate.TimedBot fills."""
+        stats = defaultdict(lambda: {"time": 0.0, "calls": 0})
+        cur = self.conn.execute(
+            "SELECT bot0, version0, bot1, version1, SUM(time0), SUM(calls0), "
+            "SUM(time1), SUM(calls1) FROM games "
+            "WHERE result_set = ? GROUP BY bot0, version0, bot1, version1",
+            (self.result_set,),
+        )
+        for bot0, version0, bot1, version1, t0, calls0, t1, calls1 in cur:
+            if self.current(bot0, version0) and self.current(bot1, version1):
+                stats[bot0]["time"] += t0
+                stats[bot0]["calls"] += calls0
+                stats[bot1]["time"] += t1
+                stats[bot1]["calls"] += calls1
+        return stats
+
+    def aggregate(self, names=None):
+        """
+        Aggregate every current game of the result set, across all runs, into the
+        (names, overall_wins, overall_games, pairwise, timing_stats) tuple
+        that evaluate.save_results expects.
+        """
+        import numpy as np
+
+        names = list(names) if names is not None else self.bots()
+        index = {n: i for i, n in enumerate(names)}
+        overall_wins = {n: 0 for n in names}
+        overall_games = {n: 0 for n in names}
+        pairwise = np.full((len(names), len(names)), np.nan)
+
+        for a, b, w, n in self.pair_counts():
+            if a not in index or b not in index:
+                continue
+            i, j = index[a], index[b]
+            pairwise[i][j] = w / n
+            pairwise[j][i] = (n - w) / n
+            overall_wins[a] += w
+            overall_wins[b] += n - w
+            overall_games[a] += n
+            overall_games[b] += n
+
+        return names, overall_wins, overall_games, pairwise, self.timing()
@@ -0,0 +1,90 @@
+# training/build_book.py
+import argparse
+import math
+import time
+
+from ur.game import UrGame
+from ur.rules import get_rules
+from ur.book import OpeningBook, BOOK_FILE, book_key
+from bots.a_expectimax2 import Expectimax2Bot
+from bots.utils import DEFAULT_EVAL_WEIGHTS, distinct_moves
+
+
+def search_move(bot, game, roll, moves):
+    """Expectimax2Bot.choose restricted to the given (deduplicated) moves."""
+    best_val = -math.inf
+    best_move = None
+    for m in moves:
+        g2 = game.clone()
+        g2.play_move(m, roll)
+        val = bot.expect_opp(g2)
+        if val > best_val:
+            best_val = val
+            best_move = m
+    return best_move
+
+
+def on_board(game):
+    final = game.rules.final_step
+    return sum(0 <= sp < final for side in game.pos for sp in side)
+
+
+def build_book(max_plies=4, max_on_board=None, rules=None, verbose=True):
+    """
+    Walk every position reachable within max_plies decisions (optionally
+    only those with at most max_on_board pieces on the board) and store the
+    deep-search move wherever there is a real choice.
+    """
+    # search every position, never consult an older book; bots only use the
+    # book while the default weights are active
+    bot = Expectimax2Bot(book=None, weights=DEFAULT_EVAL_WEIGHTS)
+
+    start = UrGame(rules)
+    frontier = {start.canonical_key(): start}
+    entries = {}
+    t0 = time.perf_counter()
+
+    for ply in range(max_plies):
+        nxt = {}
+        for game in frontier.values():
+            for roll in range(5):
+                moves = distinct_moves(game, game.legal_moves(roll))
+                if not moves:
+                    child = game.clone()
+                    child.turn = 1 - child.turn
+                    nxt[child.canonical_key()] = child
+                    continue
+
+                if len(moves) > 1:
+                    key = book_key(game, roll)
+                    if key not in entries:
+                        best = search_move(bot, game, roll, moves)
+                        entries[key] = game.pos[game.turn][best]
+
+                for m in moves:
+                    child = game.clone()
+                    child.play_move(m, roll)
+                    if child.winner is not None:
+                        continue
+                    if max_on_board is not None and on_board(child) > max_on_board:
+                        continue
+                    nxt[child.canonical_key()] = child
+        frontier = nxt
+        if verbose:
+            print(f"ply {ply + 1}: {len(entries)} entries, "
+                  f"{len(frontier)} frontier positions, {time.perf_counter() - t0:.0f}s")
+
+    return OpeningBook.from_entries(entries, start.rules)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Expectimax2Bot opening book")
+    parser.add_argument("--plies", type=int, default=4)
+    parser.add_argument("--max-on-board", type=int, default=None)
+    parser.add_argument("--rules", default="default")
+    parser.add_argument("--out", default=str(BOOK_FILE))
+    args = parser.parse_args()
+
+    book = build_book(args.plies, args.max_on_board, get_rules(args.rules))
+    book.save(args.out)
+    print("Saved", len(book), "entries to", args.out)
@@ -0,0 +1,152 @@
+# training/compact_q.py
+"""
+Convert a pickled QBot table into the compact QTable inference format.
+
+    python -m training.compact_q --dtype float16
+
+Entries are re-keyed by (canonical position, step of the moving piece).
+Each key takes the value QBot would act on: the best of the pieces on that
+step, where a piece with no entry counts as 0.0. Keys equal to the 0.0
+default are dropped. Where the pickled table values piece-renumbered copies
+of one position differently, the copies share a key and the larger value
+wins, so QBot and CompactQBot can pick different moves there.
+
+Every stored state is replayed with every roll and the best moves (up to
+interchangeable pieces) are compared twice: the re-keyed entries against
+the pickled table, reported as renumbering differences, and the quantized
+table against the re-keyed entries. Quantization must not change any best
+move: if it does, the next wider dtype (int8, float16, float32) is tried,
+and the script exits with an error if even float32 changes one. It also
+reports memory and load time.
+"""
+import argparse
+import pickle
+import sys
+import time
+import tracemalloc
+
+from ur.game import UrGame
+from ur.rules import get_rules
+from training.qlearn import SAVE_FILE
+from bots.qbot import QTABLE_FILE, CompactQBot, QTable, qtable_key
+
+# dtypes in order of precision; a table that changes best moves is rebuilt wider
+WIDER = ("int8", "float16", "float32")
+
+
+def load_pickle(path):
+    """(Q dict, seconds, bytes allocated) for loading the pickled table."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        q = pickle.load(f)
+    dt = time.perf_counter() - t0
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return q, dt, size
+
+
+def game_for(state, rules):
+    game = UrGame(rules)
+    game.pos = [list(state[0]), list(state[1])]
+    game.turn = state[2]
+    return game
+
+
+def reduce_entries(q, rules):
+    by_state = {}
+    for (state, m), v in q.items():
+        by_state.setdefault(state, {})[m] = v
+
+    entries = {}
+    for state, values in by_state.items():
+        game = game_for(state, rules)
+        canonical = game.canonical_key()
+        mine = state[game.turn]
+        best = {}
+        for m, step in enumerate(mine):
+            if step == rules.final_step:
+                continue
+            v = values.get(m, 0.0)
+            best[step] = max(best.get(step, v), v)
+        for step, v in best.items():
+            key = qtable_key(canonical, step)
+            entries[key] = max(entries.get(key, v), v)
+    return {k: v for k, v in entries.items() if v != 0.0}, by_state
+
+
+def best_steps(game, moves, qs):
+    maxq = max(qs)
+    mine = game.pos[game.turn]
+    return {mine[m] for m, v in zip(moves, qs) if v == maxq}
+
+
+def keyed_values(lookup, game, moves):
+    """Values of moves under qtable_key from a {key: value} dict or a QTable."""
+    canonical = game.canonical_key()
+    mine = game.pos[game.turn]
+    return [lookup.get(qtable_key(canonical, mine[m]), 0.0) for m in moves]
+
+
+def verify(by_state, entries, table, rules, limit=None):
+    """
+    (decisions checked, decisions whose best steps the re-keyed entries
+    change from the pickled table's, decisions whose best steps the
+    quantized table changes from the re-keyed entries')
+    """
+    checked = renumbered = quantized = 0
+    for n, (state, values) in enumerate(by_state.items()):
+        if limit is not None and n >= limit:
+            break
+        game = game_for(state, rules)
+        for roll in range(1, 5):
+            moves = game.legal_moves(roll)
+            if not moves:
+                continue
+            checked += 1
+            reduced = best_steps(game, moves, keyed_values(entries, game, moves))
+            if best_steps(game, moves, [values.get(m, 0.0) for m in moves]) != reduced:
+                renumbered += 1
+            if best_steps(game, moves, keyed_values(table, game, moves)) != reduced:
+                quantized += 1
+    return checked, renumbered, quantized
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the compact QBot inference table")
+    parser.add_argument("--input", default=str(SAVE_FILE))
+    parser.add_argument("--out", default=str(QTABLE_FILE))
+    parser.add_argument("--dtype", choices=WIDER, default="float16",
+                        help="narrowest dtype to try; wider ones are used if it changes a best move")
+    parser.add_argument("--rules", default="default", help="variant the table was trained on")
+    parser.add_argument("--verify-limit", type=int, default=None,
+                        help="check only this many stored states")
+    args = parser.parse_args()
+    rules = get_rules(args.rules)
+
+    q, load_pkl, mem_pkl = load_pickle(args.input)
+    entries, by_state = reduce_entries(q, rules)
+    for dtype in WIDER[WIDER.index(args.dtype):]:
+        table = QTable.from_entries(entries, rules.pieces, dtype)
+        checked, renumbered, quantized = verify(by_state, entries, table, rules,
+                                                args.verify_limit)
+        if not quantized:
+            break
+        print(f"{dtype} changes the best move in {quantized}/{checked} decisions")
+    else:
+        sys.exit("quantization changes best moves at every dtype; nothing saved")
+    table.save(args.out)
+
+    t0 = time.perf_counter()
+    CompactQBot(args.out)
+    load_compact = time.perf_counter() - t0
+
+    print(f"{len(q)} entries over {len(by_state)} states -> {len(table)} {dtype} entries")
+    print(f"memory    {mem_pkl / 1e6:10.1f} MB -> {table.nbytes() / 1e6:8.2f} MB "
+          f"(x{mem_pkl / max(table.nbytes(), 1):.0f})")
+    print(f"load time {load_pkl:10.3f} s  -> {load_compact:8.3f} s  "
+          f"(x{load_pkl / max(load_compact, 1e-9):.0f})")
+
+    print(f"quantization keeps the best move in all {checked} decisions checked")
+    print(f"renumbered copies merged change the best move in {renumbered}/{checked} decisions")
+    print("Saved", args.out)
@@ -0,0 +1,168 @@
+# training/gen_data.py
+"""
+Self-play training data in memory-mappable NumPy shards.
+
+    python -m training.gen_data --bots greedy_bot,a_expectimax1 --games 2000 --rules classic
+
+Games between the listed bots (every ordered pair, self-play included) are
+played in parallel, one shard per worker task. Each shard is a directory of
+.npy files with one row per decision, all from the mover's point of view:
+
+    pos      (n, 2, pieces) int8   steps of the mover's and the opponent's pieces
+    roll     (n,)           int8
+    mask     (n, pieces)    bool   legal moves
+    move     (n,)           int8   piece chosen
+    outcome  (n,)           int8   +1 if the mover went on to win, -1 if not
+    policy   (n,)           int8   index into index.json "bots" of the mover
+    game     (n,)           int32  global game number
+
+index.json records the settings and each shard's game and row counts.
+Shards are written under a temporary name and renamed when complete, so an
+interrupted (or extended) run can be resumed with the same settings. Read them back with open_shards(), which
+memory-maps every array instead of loading it.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from array import array
+from multiprocessing import Pool
+from pathlib import Path
+
+from evaluate import play_game
+from ur.game import UrGame
+from ur.rules import get_rules
+from bots.registry import BotRegistry
+
+DATA_DIR = Path("trained") / "selfplay"
+FIELDS = ("pos", "roll", "mask", "move", "outcome", "policy", "game")
+
+
+def pairings(n_bots):
+    return [(i, j) for i in range(n_bots) for j in range(n_bots)]
+
+
+def play_shard(task):
+    """Worker: play the shard's games and write its arrays; returns (shard, games, rows)."""
+    import numpy as np
+
+    shard, first_game, n_games, names, rules_name, base_seed, out_dir = task
+    rules = get_rules(rules_name)
+    registry = BotRegistry(names)
+    bots = [registry[name]() for name in names]
+    pairs = pairings(len(names))
+    pieces = rules.pieces
+
+    pos = array("b")
+    rolls = array("b")
+    mask = array("b")
+    moves = array("b")
+    outcome = array("b")
+    policy = array("b")
+    games = array("i")
+
+    for g in range(first_game, first_game + n_games):
+        seats = pairs[g % len(pairs)]
+        plies = []
+        winner = play_game(bots[seats[0]], bots[seats[1]], seed=base_seed + g,
+                           record=plies, rules=rules)
+
+        game = UrGame(rules)
+        for roll, piece in plies:
+            if piece is None:
+                game.turn = 1 - game.turn
+                continue
+            me = game.turn
+            legal = game.legal_moves(roll)
+            pos.extend(game.pos[me])
+            pos.extend(game.pos[1 - me])
+            rolls.append(roll)
+            row = [0] * pieces
+            for m in legal:
+                row[m] = 1
+            mask.extend(row)
+            moves.append(piece)
+            outcome.append(1 if winner == me else -1)
+            policy.append(seats[me])
+            games.append(g)
+            game.play_move(piece, roll)
+
+    n = len(rolls)
+    arrays = {
+        "pos": np.frombuffer(pos, dtype=np.int8).reshape(n, 2, pieces),
+        "roll": np.frombuffer(rolls, dtype=np.int8),
+        "mask": np.frombuffer(mask, dtype=np.int8).reshape(n, pieces).astype(bool),
+        "move": np.frombuffer(moves, dtype=np.int8),
+        "outcome": np.frombuffer(outcome, dtype=np.int8),
+        "policy": np.frombuffer(policy, dtype=np.int8),
+        "game": np.frombuffer(games, dtype=np.int32),
+    }
+
+    final = Path(out_dir) / f"shard_{shard:05d}"
+    tmp = final.with_name(final.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for field, arr in arrays.items():
+        np.save(tmp / f"{field}.npy", arr)
+    shutil.rmtree(final, ignore_errors=True)
+    os.replace(tmp, final)
+    return shard, n_games, n
+
+
+def generate(names, n_games, out_dir=DATA_DIR, rules_name="default", games_per_shard=100,
+             base_seed=0, workers=None, verbose=True):
+    """Play n_games into shards under out_dir, skipping shards already written."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index_path = out_dir / "index.json"
+    meta = {"bots": list(names), "rules": rules_name, "seed": base_seed,
+            "games_per_shard": games_per_shard}
+    index = json.loads(index_path.read_text()) if index_path.exists() else {"shards": {}}
+    old = {k: v for k, v in index.items() if k != "shards"}
+    if old and old != meta:
+        raise ValueError(f"{out_dir} holds data generated with other settings: {old}")
+    index.update(meta)
+
+    tasks = []
+    for shard, first in enumerate(range(0, n_games, games_per_shard)):
+        count = min(games_per_shard, n_games - first)
+        done = index["shards"].get(f"shard_{shard:05d}")
+        if done is None or done["games"] != count:
+            tasks.append((shard, first, count, list(names), rules_name, base_seed, str(out_dir)))
+
+    t0 = time.perf_counter()
+    with Pool(workers) as pool:
+        for shard, games, rows in pool.imap_unordered(play_shard, tasks):
+            index["shards"][f"shard_{shard:05d}"] = {"games": games, "rows": rows}
+            index_path.write_text(json.dumps(index, indent=1, sort_keys=True))
+            if verbose:
+                print(f"shard {shard}: {rows} positions ({time.perf_counter() - t0:.0f}s)")
+    return index
+
+
+def open_shards(data_dir=DATA_DIR):
+    """Yield one {field: read-only memmap} dict per completed shard, in order."""
+    import numpy as np
+
+    data_dir = Path(data_dir)
+    index = json.loads((data_dir / "index.json").read_text())
+    for name in sorted(index["shards"]):
+        yield {field: np.load(data_dir / name / f"{field}.npy", mmap_mode="r") for field in FIELDS}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate self-play training shards")
+    parser.add_argument("--bots", required=True, help="comma-separated bots/ policies")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--rules", default="default")
+    parser.add_argument("--games-per-shard", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default=str(DATA_DIR))
+    args = parser.parse_args()
+
+    index = generate(args.bots.split(","), args.games, args.out, args.rules,
+                     args.games_per_shard, args.seed, args.workers)
+    rows = sum(s["rows"] for s in index["shards"].values())
+    print(f"{len(index['shards'])} shards, {rows} positions in {args.out}")
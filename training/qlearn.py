@@ -1,9 +1,11 @@
 # training/qlearn.py
+import argparse
 import random
 import pickle
 from pathlib import Path
 
 from ur.game import UrGame
+from ur.fast import ENGINES, get_engine
 
 
 SAVE_DIR = Path("trained")
@@ -56,12 +58,12 @@ class QBot:
 # Training Loop
 # -----------------------------
 
-def train(episodes=50000, alpha=0.3, gamma=0.9):
+def train(episodes=50000, alpha=0.3, gamma=0.9, engine=UrGame):
     bot = QBot()
     opponent = RandomOpponent()
 
     for ep in range(episodes):
-        game = UrGame()
+        game = engine()
 
         last_state = None
         last_action = None
@@ -132,4 +134,10 @@ class RandomOpponent:
 # -----------------------------
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Train QBot against a random opponent")
+    parser.add_argument("--episodes", type=int, default=50000)
+    parser.add_argument("--engine", default="ur", choices=sorted(ENGINES),
+                        help="game engine; fast is ur.fast.FastGame (identical games)")
+    args = parser.parse_args()
+
+    train(args.episodes, engine=get_engine(args.engine))
@@ -0,0 +1,115 @@
+# training/tune.py
+import argparse
+import math
+import os
+import random
+import time
+from multiprocessing import Pool
+
+from evaluate import play_game
+from ur.rules import get_rules
+from bots.utils import EVAL_PARAMS, EVAL_WEIGHTS_FILE, load_eval_weights, save_eval_weights
+from bots.a_expectimax1 import Expectimax1Bot
+from bots.a_expectimax2 import Expectimax2Bot
+
+
+TUNABLE_BOTS = {
+    "expectimax1": Expectimax1Bot,
+    "expectimax2": Expectimax2Bot,
+}
+
+
+def play_batch(task):
+    """
+    Worker: play every seed twice, once from each seat, between the two
+    weight vectors and return how many games weights_a won. Both vectors
+    see the same dice for a given seed (common random numbers), so the
+    result measures the weights rather than the luck of the draw.
+    """
+    bot_name, rules_name, weights_a, weights_b, seeds = task
+    cls = TUNABLE_BOTS[bot_name]
+    rules = get_rules(rules_name)
+    a = cls(weights=weights_a)
+    b = cls(weights=weights_b)
+    wins = 0
+    for seed in seeds:
+        wins += play_game(a, b, seed=seed, rules=rules) == 0
+        wins += play_game(b, a, seed=seed, rules=rules) == 1
+    return wins
+
+
+def match(pool, bot_name, rules_name, weights_a, weights_b, seeds, batch=4):
+    """Score of weights_a against weights_b in [-1, 1] over 2 * len(seeds) games."""
+    tasks = [(bot_name, rules_name, weights_a, weights_b, seeds[i:i + batch])
+             for i in range(0, len(seeds), batch)]
+    wins = sum(pool.imap_unordered(play_batch, tasks))
+    games = 2 * len(seeds)
+    return (2 * wins - games) / games
+
+
+def spsa(pool, start, iterations=50, pairs=32, a=0.2, c=0.2, bot_name="expectimax1",
+         rules_name="classic", base_seed=0, verbose=True):
+    """
+    SPSA in log-weight space (weights stay positive; steps are relative).
+
+    Each iteration perturbs every weight by +-c_k at once and plays the two
+    perturbed vectors against each other on `pairs` fresh seeds, both seats
+    each. The match score is the gradient estimate along the perturbation.
+    """
+    theta = [math.log(w) for w in start]
+    rng = random.Random(base_seed)
+    big_a = iterations / 10
+
+    for k in range(iterations):
+        a_k = a / (k + 1 + big_a) ** 0.602
+        c_k = c / (k + 1) ** 0.101
+        delta = [rng.choice((-1, 1)) for _ in theta]
+        plus = tuple(math.exp(t + c_k * d) for t, d in zip(theta, delta))
+        minus = tuple(math.exp(t - c_k * d) for t, d in zip(theta, delta))
+        seeds = [rng.getrandbits(32) for _ in range(pairs)]
+
+        t0 = time.perf_counter()
+        score = match(pool, bot_name, rules_name, plus, minus, seeds)
+        theta = [t + a_k * score / (2 * c_k * d) for t, d in zip(theta, delta)]
+
+        if verbose:
+            weights = ", ".join(f"{p}={math.exp(t):.3f}" for p, t in zip(EVAL_PARAMS, theta))
+            print(f"iter {k + 1}/{iterations}: score {score:+.3f}, {weights} "
+                  f"({time.perf_counter() - t0:.1f}s)")
+
+    return tuple(math.exp(t) for t in theta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune the expectimax evaluation weights with SPSA")
+    parser.add_argument("--bot", choices=sorted(TUNABLE_BOTS), default="expectimax1")
+    parser.add_argument("--rules", default="classic",
+                        help="variant to tune; the weights are saved under its name")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--pairs", type=int, default=32,
+                        help="seeds per iteration; each is played from both seats")
+    parser.add_argument("--a", type=float, default=0.2, help="SPSA step size")
+    parser.add_argument("--c", type=float, default=0.2, help="SPSA perturbation (log scale)")
+    parser.add_argument("--verify", type=int, default=200,
+                        help="seeds for the final tuned-vs-start match (0 to skip)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=str(EVAL_WEIGHTS_FILE))
+    args = parser.parse_args()
+
+    start = load_eval_weights(get_rules(args.rules), args.out)
+    print("Start:", dict(zip(EVAL_PARAMS, start)))
+
+    with Pool(args.workers) as pool:
+        tuned = spsa(pool, start, args.iterations, args.pairs, args.a, args.c,
+                     args.bot, args.rules, args.seed)
+        extra = {}
+        if args.verify:
+            rng = random.Random(args.seed + 1)
+            seeds = [rng.getrandbits(32) for _ in range(args.verify)]
+            score = match(pool, args.bot, args.rules, tuned, start, seeds)
+            print(f"Tuned vs start: win rate {(score + 1) / 2:.3f} over {2 * args.verify} games")
+            extra["verify_winrate"] = round((score + 1) / 2, 4)
+
+    save_eval_weights(tuned, get_rules(args.rules), args.out, bot=args.bot, **extra)
+    print("Saved", dict(zip(EVAL_PARAMS, tuned)), "to", args.out)
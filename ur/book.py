@@ -0,0 +1,105 @@
+# ur/book.py
+"""
+Opening book: precomputed best moves for early positions.
+
+Entries are keyed by (UrGame.canonical_key(), roll) and store the path step
+of the piece to move (-1 = enter a new piece), so a hit applies to every
+position that differs only in piece numbering. On disk the book is two
+sorted arrays (u64 keys, i8 steps) behind a small header; lookups are a
+binary search. Build one with `python -m training.build_book`.
+"""
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from ur.rules import DEFAULT_RULES
+
+MAGIC = b"URBK"
+HEADER = struct.Struct("<4sB32sI")  # magic, version, rules name, entries
+VERSION = 1
+
+BOOK_FILE = Path("trained") / "opening_book.bin"
+
+
+def book_key(game, roll):
+    return (game.canonical_key() << 3) | roll
+
+
+class OpeningBook:
+    _shared = {}
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules_name = rules.name
+        self.keys = array("Q")
+        self.steps = array("b")
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ---------------------------
+    # Lookup
+    # ---------------------------
+
+    def lookup(self, game, roll):
+        """Return the book move (a piece index) for this position, or None."""
+        if game.rules.name != self.rules_name:
+            return None
+        key = book_key(game, roll)
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            self.misses += 1
+            return None
+        step = self.steps[i]
+        mine = game.pos[game.turn]
+        if step not in mine:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return mine.index(step)
+
+    # ---------------------------
+    # Building
+    # ---------------------------
+
+    @classmethod
+    def from_entries(cls, entries, rules=DEFAULT_RULES):
+        """entries: {book_key: from_step}"""
+        book = cls(rules)
+        for key in sorted(entries):
+            book.keys.append(key)
+            book.steps.append(entries[key])
+        return book
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+
+    def save(self, path=BOOK_FILE):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.rules_name.encode(), len(self.keys)))
+            f.write(self.keys.tobytes())
+            f.write(self.steps.tobytes())
+
+    @classmethod
+    def load(cls, path=BOOK_FILE):
+        with open(path, "rb") as f:
+            magic, version, name, n = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not an opening book")
+            book = cls()
+            book.rules_name = name.rstrip(b"\0").decode()
+            book.keys.frombytes(f.read(8 * n))
+            book.steps.frombytes(f.read(n))
+        return book
+
+    @classmethod
+    def shared(cls, path=BOOK_FILE):
+        """Book loaded once per process and shared by all bots; None if no book file exists."""
+        path = Path(path)
+        if path not in cls._shared:
+            cls._shared[path] = cls.load(path) if path.exists() else None
+        return cls._shared[path]
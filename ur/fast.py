@@ -0,0 +1,204 @@
+# ur/fast.py
+"""
+FastGame: a drop-in UrGame that keeps each side's occupied steps as a
+bitmask alongside the position lists.
+
+Legal-move generation becomes a few shifts and masks, then one
+bytes.translate over the pieces, with no per-piece Python loop, set
+building or list scans. Captures only search the opponent's list when the
+mask says a piece is there, and the winner check is a counter. The dice consume the global RNG exactly like
+UrGame.roll_dice, so seeded games are identical move for move. The
+differential harness in benchmarks/fuzz_engine.py checks all of that
+against ur/game.py.
+
+Code that edits game.pos directly must call sync() afterwards.
+"""
+import random
+from itertools import compress
+
+from ur.game import UrGame
+
+_tables = {}
+
+
+class _Tables:
+    """Per-rules bitmask tables, built once."""
+
+    def __init__(self, rules):
+        final = rules.final_step
+        self.final = final
+        self.finish_bit = 1 << final
+        self.board_bits = (1 << final) - 1
+        self.rosette = tuple(
+            tuple(bool(r) for r in rules.rosette_steps[p]) for p in (0, 1)
+        )
+        self.safe_mask = tuple(
+            sum(1 << s for s in range(final) if rules.safe_steps[p][s]) for p in (0, 1)
+        )
+        # opponent step -> bit of the same square in my steps (0 off the shared lane)
+        self.opp_bit_to_mine = tuple(
+            tuple(
+                0 if rules.opp_steps[1 - p][s] is None else 1 << rules.opp_steps[1 - p][s]
+                for s in range(final)
+            )
+            for p in (0, 1)
+        )
+        # steps where my pieces can capture: shared and not safe
+        self.capture_mask = tuple(
+            sum(1 << s for s in range(final)
+                if rules.opp_steps[p][s] is not None and not rules.safe_steps[p][s])
+            for p in (0, 1)
+        )
+        self._opp = ({}, {})
+        # movable-from bitmask (bit 0 = entering, bit s + 1 = step s) -> bytes.translate
+        # table over piece codes (step + 1: 0 offboard, final + 1 finished)
+        self.ok = {}
+
+    def opp_on_mine(self, p, opp_mask):
+        out = self._opp[p].get(opp_mask)
+        if out is None:
+            out = 0
+            bits = self.opp_bit_to_mine[p]
+            m = opp_mask
+            while m:
+                low = m & -m
+                m ^= low
+                out |= bits[low.bit_length() - 1]
+            self._opp[p][opp_mask] = out
+        return out
+
+    def ok_table(self, movable):
+        table = self.ok.get(movable)
+        if table is None:
+            table = bytes(movable >> c & 1 for c in range(self.final + 1)).ljust(256, b"\0")
+            self.ok[movable] = table
+        return table
+
+
+def tables_for(rules):
+    t = _tables.get(rules)
+    if t is None:
+        t = _tables[rules] = _Tables(rules)
+    return t
+
+
+class FastGame(UrGame):
+    """
+    UrGame plus, per side, a step bitmask (mask), a finished count (done)
+    and a bytearray of step + 1 per piece (code). mask and done are tuples,
+    so clones share them until the next move replaces them.
+    """
+
+    def reset(self):
+        super().reset()
+        self.sync()
+
+    def sync(self):
+        """Rebuild the masks, counters and codes from self.pos."""
+        final = self.rules.final_step
+        self._t = tables_for(self.rules)
+        mask = [0, 0]
+        done = [0, 0]
+        for p in (0, 1):
+            for sp in self.pos[p]:
+                if sp == final:
+                    done[p] += 1
+                elif sp >= 0:
+                    mask[p] |= 1 << sp
+        self.mask = tuple(mask)
+        self.done = tuple(done)
+        self.code = [bytearray(sp + 1 for sp in side) for side in self.pos]
+
+    def clone(self):
+        g = self.__class__.__new__(self.__class__)
+        g.rules = self.rules
+        g._t = self._t
+        g.pos = [self.pos[0][:], self.pos[1][:]]
+        g.code = [self.code[0][:], self.code[1][:]]
+        g.mask = self.mask
+        g.done = self.done
+        g.turn = self.turn
+        g.winner = self.winner
+        return g
+
+    def canonical_key(self):
+        final = self._t.final
+        count_bits = self.rules.pieces.bit_length()
+        m0, m1 = self.mask
+        d0, d1 = self.done
+        return (((((((self.turn << count_bits) | d0) << final) | m0) << count_bits) | d1) << final) | m1
+
+    def roll_dice(self):
+        # same draws as random.choices((0, 1), weights=(1, 3), k=4): one random() per die,
+        # which is a 1 unless random() * 4 < 1
+        r = random.random
+        return (r() * 4 >= 1) + (r() * 4 >= 1) + (r() * 4 >= 1) + (r() * 4 >= 1)
+
+    def movable(self, roll):
+        """Bitmask of steps that can move (bit 0 = entering, bit s + 1 = step s)."""
+        t = self._t
+        p = self.turn
+        own = self.mask[p]
+        blocked = own | (t.safe_mask[p] & t.opp_on_mine(p, self.mask[1 - p]))
+        # targets on the board must be free; the finish (bit final) never is blocked
+        targets = (((own << 1) | 1) << (roll - 1)) & ~blocked & (t.board_bits | t.finish_bit)
+        return targets >> (roll - 1)
+
+    def legal_moves(self, roll):
+        if roll == 0:
+            return []
+        code = self.code[self.turn]
+        return list(compress(range(len(code)), code.translate(self._t.ok_table(self.movable(roll)))))
+
+    def play_move(self, piece, roll):
+        p = self.turn
+        t = self._t
+        final = t.final
+        pos = self.pos[p][piece]
+        new = pos + roll
+        self.pos[p][piece] = new
+        self.code[p][piece] = new + 1
+        mask = self.mask[p]
+        if pos >= 0:
+            mask ^= 1 << pos
+
+        if new == final:
+            if p:
+                self.mask = (self.mask[0], mask)
+                self.done = (self.done[0], self.done[1] + 1)
+            else:
+                self.mask = (mask, self.mask[1])
+                self.done = (self.done[0] + 1, self.done[1])
+            if self.done[p] == len(self.code[p]):
+                self.winner = p
+            self.turn = 1 - p
+            return
+
+        mask |= 1 << new
+        opp_mask = self.mask[1 - p]
+        if t.capture_mask[p] >> new & 1:
+            opp_step = self.rules.opp_steps[p][new]
+            if opp_mask >> opp_step & 1:
+                opp_pos = self.pos[1 - p]
+                i = opp_pos.index(opp_step)
+                opp_pos[i] = -1
+                self.code[1 - p][i] = 0
+                opp_mask ^= 1 << opp_step
+        self.mask = (opp_mask, mask) if p else (mask, opp_mask)
+
+        if t.rosette[p][new]:
+            return
+        self.turn = 1 - p
+
+
+ENGINES = {
+    "ur": UrGame,
+    "fast": FastGame,
+}
+
+
+def get_engine(name):
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f"unknown engine {name!r}; choose from {sorted(ENGINES)}")
@@ -1,44 +1,68 @@
 # ur/game.py
 import random
-import copy
 
-# Board mapping and paths (as agreed)
-P1_PATH = [3,2,1,0,6,7,8,9,10,11,12,5,4]
-P2_PATH = [16,15,14,13,6,7,8,9,10,11,12,18,17]
+from ur.rules import (
+    DEFAULT_RULES, P1_PATH, P2_PATH, ROSETTES, SAFE_SQUARES,
+)
 
-FINAL_STEP = len(P1_PATH)  # number of on-board steps before finishing
-
-ROSETTES = {0, 4, 9, 13, 17}
-SAFE_SQUARES = {9}  # only central rosette is safe from capture
+FINAL_STEP = len(P1_PATH)  # number of on-board steps before finishing (default rules)
 
 class UrGame:
-    def __init__(self):
+    def __init__(self, rules=None):
+        self.rules = rules if rules is not None else DEFAULT_RULES
         self.reset()
 
     def reset(self):
         # positions: -1 = offboard, 0..FINAL_STEP-1 = on path step index, FINAL_STEP = finished
-        N = 50
+        N = self.rules.pieces
         self.pos = [[-1] * N, [-1] * N]
         self.turn = 0
         self.winner = None
 
     def clone(self):
-        # deep copy of full game state for safe simulation by bots
-        return copy.deepcopy(self)
+        # copy of full game state for safe simulation by bots; rules are shared
+        g = self.__class__.__new__(self.__class__)
+        g.rules = self.rules
+        g.pos = [self.pos[0][:], self.pos[1][:]]
+        g.turn = self.turn
+        g.winner = self.winner
+        return g
+
+    def canonical_key(self):
+        """
+        Integer key of the position with piece identity ignored: per player
+        the number of finished pieces and a bitmask of occupied steps (the
+        offboard count follows from those), plus whose turn it is.
+        """
+        rules = self.rules
+        final = rules.final_step
+        count_bits = rules.pieces.bit_length()
+        key = self.turn
+        for side in self.pos:
+            done = 0
+            mask = 0
+            for sp in side:
+                if sp == final:
+                    done += 1
+                elif sp >= 0:
+                    mask |= 1 << sp
+            key = (((key << count_bits) | done) << final) | mask
+        return key
 
     def roll_dice(self):
         # four binary dice with 3/4 chance of 1, 1/4 chance of 0
         return sum(random.choices((0, 1), weights=(1, 3), k=4))
 
     def path(self, player):
-        return P1_PATH if player == 0 else P2_PATH
+        return self.rules.paths[player]
 
     def occupied_by(self, player):
         """Return set of board-square indices occupied by player's pieces (only on-board)."""
         occ = set()
         path = self.path(player)
+        final = self.rules.final_step
         for sp in self.pos[player]:
-            if 0 <= sp < FINAL_STEP:
+            if 0 <= sp < final:
                 occ.add(path[sp])
         return occ
 
@@ -56,25 +80,29 @@ class UrGame:
 
         moves = []
         p = self.turn
-        path = self.path(p)
-        opp = 1 - p
-
-        for i, pos in enumerate(self.pos[p]):
-            if pos == FINAL_STEP:
+        rules = self.rules
+        final = rules.final_step
+        safe = rules.safe_steps[p]
+        opp_steps = rules.opp_steps[p]
+        mine = self.pos[p]
+        # a player's path never repeats a square, so own pieces block by step
+        own = set(mine)
+
+        for i, pos in enumerate(mine):
+            if pos == final:
                 continue  # already finished
             new = pos + roll
-            if new > FINAL_STEP:
+            if new > final:
                 continue  # overshoot illegal
             # finishing square is always legal if exact
-            if new == FINAL_STEP:
+            if new == final:
                 moves.append(i)
                 continue
-            target_sq = path[new]
             # own-piece blocking
-            if target_sq in self.occupied_by(p):
+            if new in own:
                 continue
             # if target is safe and opponent occupies it, move is illegal (can't capture safe)
-            if target_sq in SAFE_SQUARES and target_sq in self.occupied_by(opp):
+            if safe[new] and opp_steps[new] is not None and opp_steps[new] in self.pos[1 - p]:
                 continue
             moves.append(i)
         return moves
@@ -88,6 +116,8 @@ class UrGame:
          - update winner if finished
         """
         p = self.turn
+        rules = self.rules
+        final = rules.final_step
         pos = self.pos[p][piece]
         new = pos + roll
 
@@ -95,26 +125,24 @@ class UrGame:
         self.pos[p][piece] = new
 
         # if finished
-        if new == FINAL_STEP:
-            if all(x == FINAL_STEP for x in self.pos[p]):
+        if new == final:
+            if all(x == final for x in self.pos[p]):
                 self.winner = p
             # finishing does not grant extra turn; switch turn
             self.turn = 1 - p
             return
 
-        # landing square index on board
-        target = self.path(p)[new]
-
-        # capture opponent piece at target unless target is in SAFE_SQUARES
-        if target not in SAFE_SQUARES:
-            opp = 1 - p
-            for idx, opp_pos in enumerate(self.pos[opp]):
-                if 0 <= opp_pos < FINAL_STEP and self.path(opp)[opp_pos] == target:
-                    # send opponent piece to start
-                    self.pos[opp][idx] = -1
+        # capture opponent piece at target unless target is a safe square;
+        # blocking guarantees at most one opponent piece there
+        opp_step = rules.opp_steps[p][new]
+        if opp_step is not None and not rules.safe_steps[p][new]:
+            opp_pos = self.pos[1 - p]
+            if opp_step in opp_pos:
+                # send opponent piece to start
+                opp_pos[opp_pos.index(opp_step)] = -1
 
         # if landed on a rosette, player gets another turn (do not switch)
-        if target in ROSETTES:
+        if rules.rosette_steps[p][new]:
             return
 
         # otherwise switch turn
@@ -0,0 +1,461 @@
+# ur/race.py
+"""
+Exact win probabilities for races.
+
+A position is a race once one player has every piece past the shared lane
+(or finished): from then on no capture or blocking between the players is
+possible, so each side's pieces move independently and the game can be
+solved exactly. A side is stored as (off, mask): pieces still off the board
+and a bitmask of occupied path steps; the rest are finished.
+
+Values are the probability that player 0 wins with both sides playing the
+race perfectly, worked out over the dice distribution. Every move adds its
+roll to the mover's progress (the sum of step + 1 over its pieces), so a
+query solves every (side 0, side 1) pair reachable from its position in
+one iterative pass, from the highest total progress down, each level
+vectorised with NumPy. The solved block stays cached: later positions of
+the same race lie inside it and are lookups.
+
+The cost is the product of the two sides' reachable states, roughly 5 us
+and 200 bytes per pair. 7-piece races are at most a few thousand pairs and
+milliseconds, but the worst 50-piece race (pos[0] = [13] * 48 + [11, 12]
+against a side with every piece still to enter) is 1,458,176 pairs: 7-17 s
+and about 300 MB for one cold solve. So a table only solves races whose
+pair count, bounded from the position alone by pair_bound(), fits in
+max_pairs (250,000 by default, about a second); solvable() says whether a
+position qualifies, and the bots search normally when it does not.
+
+    python -m ur.race records.bin --rules classic
+
+replays a record file and reports how often games reached a race, how well
+the exact probabilities predicted the results, and the win probability each
+seat gave away with its race moves.
+"""
+import argparse
+import math
+from collections import OrderedDict
+
+from ur.rules import DEFAULT_RULES, get_rules
+
+# P(roll) for UrGame.roll_dice: four binary dice, each 1 with probability 3/4
+ROLL_PROBS = tuple(math.comb(4, k) * 3 ** k / 4 ** 4 for k in range(5))
+
+
+class RaceTable:
+    _shared = {}
+    # solved blocks kept per table; older ones are dropped first
+    max_blocks = 8
+    # largest block solve() builds; math.inf for no limit
+    max_pairs = 250_000
+
+    def __init__(self, rules=DEFAULT_RULES, max_pairs=None):
+        self.rules = rules
+        if max_pairs is not None:
+            self.max_pairs = max_pairs
+        self.final = rules.final_step
+        # last step on which each player can still meet the opponent
+        self.lane_end = tuple(
+            max((s for s in range(self.final) if rules.opp_steps[p][s] is not None), default=-1)
+            for p in (0, 1)
+        )
+        self.blocks = OrderedDict()  # (side 0, side 1) root -> _Block
+
+    def __len__(self):
+        """Positions held in the cached blocks."""
+        return sum(len(b) for b in self.blocks.values())
+
+    @classmethod
+    def shared(cls, rules=DEFAULT_RULES):
+        """Table shared by all callers in this process, one per rules variant."""
+        if rules.name not in cls._shared:
+            cls._shared[rules.name] = cls(rules)
+        return cls._shared[rules.name]
+
+    # ---------------------------
+    # Positions
+    # ---------------------------
+
+    def is_race(self, game):
+        if game.winner is not None or game.rules.name != self.rules.name:
+            return False
+        return any(all(sp > self.lane_end[p] for sp in game.pos[p]) for p in (0, 1))
+
+    def side(self, steps):
+        off = 0
+        mask = 0
+        for sp in steps:
+            if sp < 0:
+                off += 1
+            elif sp < self.final:
+                mask |= 1 << sp
+        return off, mask
+
+    def code(self, side):
+        """Side state as one integer, off << final | mask."""
+        return side[0] << self.final | side[1]
+
+    def moves(self, p, codes, roll):
+        """
+        Successor codes of every state in `codes` for one roll of player p:
+        an (n, final + 1) array whose column 0 enters a piece and column
+        s + 1 moves the piece on step s, -1 where that move is not legal.
+        """
+        import numpy as np
+
+        final = self.final
+        off = codes >> final
+        mask = codes & ((1 << final) - 1)
+        out = np.full((len(codes), final + 1), -1, dtype=np.int64)
+        new = roll - 1
+        ok = (off > 0) & (mask >> new & 1 == 0)
+        out[ok, 0] = ((off - 1) << final | mask | 1 << new)[ok]
+        for s in range(final + 1 - roll):
+            new = s + roll
+            ok = mask >> s & 1 == 1
+            if new == final:
+                nxt = off << final | (mask ^ 1 << s)
+            else:
+                ok &= mask >> new & 1 == 0
+                nxt = off << final | (mask ^ 1 << s | 1 << new)
+            out[ok, s + 1] = nxt[ok]
+        return out
+
+    def extra_turn(self, p, roll):
+        """Per column of moves(p, ..., roll): whether the move lands on a rosette."""
+        import numpy as np
+
+        final = self.final
+        rosettes = self.rules.rosette_steps[p]
+        return np.array([bool(rosettes[roll - 1])] + [
+            s + roll < final and bool(rosettes[s + roll]) for s in range(final)
+        ])
+
+    def progress(self, codes):
+        """Per state: the sum of step + 1 over its pieces, a finished piece counting final + 1."""
+        import numpy as np
+
+        final = self.final
+        mask = codes & ((1 << final) - 1)
+        on = np.zeros(len(codes), dtype=np.int64)
+        pips = (self.rules.pieces - (codes >> final)) * (final + 1)
+        for s in range(final):
+            bit = mask >> s & 1
+            on += bit
+            pips += bit * (s + 1)
+        return pips - on * (final + 1)
+
+    def reach(self, p, side):
+        """Sorted codes of every side state player p can reach from `side`."""
+        import numpy as np
+
+        seen = np.zeros((self.rules.pieces + 1) << self.final, dtype=bool)
+        frontier = np.array([self.code(side)], dtype=np.int64)
+        seen[frontier] = True
+        while len(frontier):
+            nxt = np.concatenate([self.moves(p, frontier, roll).ravel()
+                                  for roll in range(1, len(ROLL_PROBS))])
+            nxt = np.unique(nxt[nxt >= 0])
+            frontier = nxt[~seen[nxt]]
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    def state_bound(self, side):
+        """
+        Upper bound on len(reach(p, side)) without walking it: at most `off`
+        pieces still to enter, the rest finished or on the board, and with
+        nothing left to enter no piece behind the rearmost one.
+        """
+        off, mask = side
+        left = off + bin(mask).count("1")
+        steps = self.final if off or not mask else self.final - ((mask & -mask).bit_length() - 1)
+        return sum(math.comb(steps, k) for o in range(off + 1)
+                   for k in range(min(left - o, steps) + 1))
+
+    def pair_bound(self, game):
+        """Upper bound on the pairs solve() needs for this position."""
+        return self.state_bound(self.side(game.pos[0])) * self.state_bound(self.side(game.pos[1]))
+
+    def solvable(self, game):
+        """Whether game is a race whose values are cached or fit in max_pairs."""
+        if not self.is_race(game):
+            return False
+        if self.pair_bound(game) <= self.max_pairs:
+            return True
+        side0, side1 = self.side(game.pos[0]), self.side(game.pos[1])
+        return self._cached(self.code(side0), self.code(side1)) is not None
+
+    # ---------------------------
+    # Values
+    # ---------------------------
+
+    def _cached(self, code0, code1):
+        for root, block in reversed(self.blocks.items()):
+            val = block.get(code0, code1)
+            if val is not None:
+                self.blocks.move_to_end(root)
+                return val
+        return None
+
+    def solve(self, side0, side1):
+        """
+        (P(player 0 wins | 0 to move), P(player 0 wins | 1 to move)).
+        Raises ValueError if the pair is not cached and its block would
+        exceed max_pairs.
+        """
+        if side0 == (0, 0):
+            return 1.0, 1.0
+        if side1 == (0, 0):
+            return 0.0, 0.0
+        code0, code1 = self.code(side0), self.code(side1)
+        val = self._cached(code0, code1)
+        if val is not None:
+            return val
+        bound = self.state_bound(side0) * self.state_bound(side1)
+        if bound > self.max_pairs:
+            raise ValueError(f"race needs up to {bound} pairs, over max_pairs={self.max_pairs}")
+        block = _Block(self, side0, side1)
+        self.blocks[(side0, side1)] = block
+        if len(self.blocks) > self.max_blocks:
+            self.blocks.popitem(last=False)
+        return block.get(code0, code1)
+
+    def _value(self, game, side0, side1, turn):
+        """P(the player to move in `game` wins) once it is `turn`'s move with these sides."""
+        v = self.solve(side0, side1)[turn]
+        return v if game.turn == 0 else 1.0 - v
+
+    def win_prob(self, game):
+        """Exact probability that the player to move wins; game must be solvable()."""
+        if not self.is_race(game):
+            raise ValueError("position is not a race")
+        return self._value(game, self.side(game.pos[0]), self.side(game.pos[1]), game.turn)
+
+    def move_probs(self, game, roll):
+        """[(move, P(mover wins after it))] for every legal move; game must be solvable()."""
+        if not self.is_race(game):
+            raise ValueError("position is not a race")
+        p = game.turn
+        out = []
+        for m in game.legal_moves(roll):
+            g2 = game.clone()
+            g2.play_move(m, roll)
+            if g2.winner is not None:
+                out.append((m, 1.0))
+            else:
+                out.append((m, self.win_prob(g2) if g2.turn == p else 1.0 - self.win_prob(g2)))
+        return out
+
+    def best_move(self, game, roll):
+        """Move with the highest race win probability (first of equals), or None."""
+        best = None
+        best_p = -1.0
+        for m, prob in self.move_probs(game, roll):
+            if prob > best_p:
+                best, best_p = m, prob
+        return best
+
+
+class _Block:
+    """
+    Values of every pair in reach(0, side0) x reach(1, side1).
+
+    values[t, i * n1 + j] is P(player 0 wins) with player t to move, side
+    0 in state codes[0][i] and side 1 in state codes[1][j]. A pair depends
+    only on pairs of higher total progress, so all pairs with equal total
+    are solved together.
+    """
+
+    def __init__(self, table, side0, side1):
+        import numpy as np
+
+        self.codes = (table.reach(0, side0), table.reach(1, side1))
+        n0, n1 = len(self.codes[0]), len(self.codes[1])
+        self.n1 = n1
+        values = np.zeros((2, n0 * n1))
+
+        # per player and roll: successor indices (invalid ones point at 0),
+        # which of them are legal, whether any is, and the extra-turn columns
+        succ = []
+        for p, codes in enumerate(self.codes):
+            per_roll = []
+            for roll in range(1, len(ROLL_PROBS)):
+                nxt = table.moves(p, codes, roll)
+                legal = nxt >= 0
+                idx = np.where(legal, np.searchsorted(codes, nxt), 0)
+                per_roll.append((ROLL_PROBS[roll], idx, legal, legal.any(axis=1),
+                                 table.extra_turn(p, roll)))
+            succ.append(per_roll)
+
+        # a finished side has code 0, first in its sorted codes; player 0
+        # finishing wins, checked first as in solve()
+        live = np.ones((n0, n1), dtype=bool)
+        if self.codes[1][0] == 0:
+            values[:, ::n1] = 0.0
+            live[:, 0] = False
+        if self.codes[0][0] == 0:
+            values[:, :n1] = 1.0
+            live[0, :] = False
+
+        total = np.add.outer(table.progress(self.codes[0]), table.progress(self.codes[1])).ravel()
+        flat = np.flatnonzero(live.ravel())
+        flat = flat[np.argsort(-total[flat], kind="stable")]
+        levels = np.flatnonzero(np.diff(total[flat])) + 1
+
+        for f in np.split(flat, levels):
+            i, j = np.divmod(f, n1)
+            # x = value from the rolls that move; q = chance the turn passes
+            x0, q0 = self._expect(values, succ[0], i, lambda c: c * n1 + j[:, None], 0)
+            x1, q1 = self._expect(values, succ[1], j, lambda c: i[:, None] * n1 + c, 1)
+            # passing hands the same position to the other player:
+            # v0 = x0 + q0 * v1 and v1 = x1 + q1 * v0
+            v0 = (x0 + q0 * x1) / (1 - q0 * q1)
+            values[0, f] = v0
+            values[1, f] = x1 + q1 * v0
+        self.values = values
+
+    @staticmethod
+    def _expect(values, per_roll, mine, flat, p):
+        """
+        Sum over rolls of P(roll) * the value of player p's best move (player 0
+        maximises, player 1 minimises), and P(the turn passes).
+        """
+        import numpy as np
+
+        worst = -np.inf if p == 0 else np.inf
+        best = np.max if p == 0 else np.min
+        x = np.zeros(len(mine))
+        q = np.full(len(mine), ROLL_PROBS[0])
+        for prob, idx, legal, has, extra in per_roll:
+            f = flat(idx[mine])
+            # an extra turn keeps the move with p, otherwise it passes to 1 - p
+            v = np.where(extra, values[p][f], values[1 - p][f])
+            top = best(np.where(legal[mine], v, worst), axis=1)
+            moves = has[mine]
+            x += prob * np.where(moves, top, 0.0)
+            q += prob * ~moves
+        return x, q
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    def get(self, code0, code1):
+        i = self._find(self.codes[0], code0)
+        j = self._find(self.codes[1], code1)
+        if i is None or j is None:
+            return None
+        f = i * self.n1 + j
+        return float(self.values[0, f]), float(self.values[1, f])
+
+    @staticmethod
+    def _find(codes, code):
+        import numpy as np
+
+        i = int(np.searchsorted(codes, code))
+        return i if i < len(codes) and codes[i] == code else None
+
+
+def is_race(game):
+    return RaceTable.shared(game.rules).is_race(game)
+
+
+def race_win_prob(game):
+    """Exact probability that the player to move wins a race position."""
+    return RaceTable.shared(game.rules).win_prob(game)
+
+
+# ---------------------------
+# Record analysis
+# ---------------------------
+
+def analyse_records(path, rules=DEFAULT_RULES, max_pairs=RaceTable.max_pairs):
+    """
+    Replay a record file and, for every game that reaches a race, compare
+    the exact win probability at the first race position with the result,
+    and add up the win probability each seat lost by not playing the best
+    race move. Race positions over max_pairs are skipped and counted.
+    """
+    from tournament.records import replay
+
+    table = RaceTable(rules, max_pairs)
+    games = races = too_large = 0
+    predicted = actual = brier = 0.0
+    lost = [0.0, 0.0]
+    mistakes = [0, 0]
+    race_moves = [0, 0]
+
+    first = None  # P(player 0 wins) at the current game's first race position
+    current = None
+
+    def finish(game):
+        nonlocal races, predicted, actual, brier
+        if first is None or game.winner is None:
+            return
+        won = 1.0 if game.winner == 0 else 0.0
+        races += 1
+        predicted += first
+        actual += won
+        brier += (first - won) ** 2
+
+    last = None
+    for gi, game, roll, piece in replay(path, rules=rules):
+        if gi != current:
+            if last is not None:
+                finish(last)
+            games += 1
+            current = gi
+            first = None
+        last = game
+        if not table.is_race(game):
+            continue
+        if not table.solvable(game):
+            too_large += 1
+            continue
+        if first is None:
+            p = table.win_prob(game)
+            first = p if game.turn == 0 else 1.0 - p
+        if piece is None:
+            continue
+        probs = dict(table.move_probs(game, roll))
+        if len(probs) < 2:
+            continue
+        seat = game.turn
+        race_moves[seat] += 1
+        loss = max(probs.values()) - probs[piece]
+        if loss > 1e-12:
+            mistakes[seat] += 1
+            lost[seat] += loss
+    if last is not None:
+        finish(last)
+
+    return {
+        "games": games,
+        "races": races,
+        "predicted_p0": predicted / races if races else None,
+        "actual_p0": actual / races if races else None,
+        "brier": brier / races if races else None,
+        "race_moves": race_moves,
+        "mistakes": mistakes,
+        "win_prob_lost": lost,
+        "positions_solved": len(table),
+        "too_large": too_large,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact race analysis of a game record file")
+    parser.add_argument("records")
+    parser.add_argument("--rules", default="default")
+    parser.add_argument("--max-pairs", type=int, default=RaceTable.max_pairs,
+                        help="largest race table to solve (0 for no limit)")
+    args = parser.parse_args()
+
+    report = analyse_records(args.records, get_rules(args.rules), args.max_pairs or math.inf)
+    print(f"{report['games']} games, {report['races']} reached a race")
+    if report["races"]:
+        print(f"P(seat 0 wins) at first race: predicted {report['predicted_p0']:.3f}, "
+              f"actual {report['actual_p0']:.3f}, Brier {report['brier']:.4f}")
+    for seat in (0, 1):
+        print(f"seat {seat}: {report['mistakes'][seat]}/{report['race_moves'][seat]} "
+              f"race moves below best, {report['win_prob_lost'][seat]:.3f} win probability lost")
+    print(f"{report['positions_solved']} race positions solved, "
+          f"{report['too_large']} race positions over --max-pairs skipped")
@@ -0,0 +1,73 @@
+# ur/rules.py
+"""
+Rule variants for UrGame.
+
+A Rules object fixes the piece count, both players' paths and the special
+squares, and precomputes per-player, per-step lookup tables once so the
+engine and the bots never test set membership on the hot path.
+"""
+
+# Board mapping and paths (as agreed)
+P1_PATH = [3,2,1,0,6,7,8,9,10,11,12,5,4]
+P2_PATH = [16,15,14,13,6,7,8,9,10,11,12,18,17]
+
+ROSETTES = {0, 4, 9, 13, 17}
+SAFE_SQUARES = {9}  # only central rosette is safe from capture
+
+PIECES = 50
+
+
+class Rules:
+    def __init__(self, name="default", pieces=PIECES, p1_path=P1_PATH, p2_path=P2_PATH,
+                 rosettes=ROSETTES, safe_squares=SAFE_SQUARES):
+        if len(p1_path) != len(p2_path):
+            raise ValueError("both paths must have the same length")
+        self.name = name
+        self.pieces = pieces
+        self.paths = (tuple(p1_path), tuple(p2_path))
+        self.rosettes = frozenset(rosettes)
+        self.safe_squares = frozenset(safe_squares)
+
+        # positions: -1 = offboard, 0..final_step-1 = on path, final_step = finished
+        self.final_step = len(p1_path)
+
+        # [player][step] tables
+        self.rosette_steps = tuple(
+            tuple(sq in self.rosettes for sq in path) for path in self.paths
+        )
+        self.safe_steps = tuple(
+            tuple(sq in self.safe_squares for sq in path) for path in self.paths
+        )
+        # the opponent's step index on the square at my step, or None if the
+        # opponent never passes through it (i.e. no contact possible there)
+        self.opp_steps = tuple(
+            tuple(
+                self.paths[1 - p].index(sq) if sq in self.paths[1 - p] else None
+                for sq in self.paths[p]
+            )
+            for p in (0, 1)
+        )
+
+    def __repr__(self):
+        return f"<Rules {self.name} pieces={self.pieces} final_step={self.final_step}>"
+
+
+DEFAULT_RULES = Rules()
+
+# Variants selectable by name (evaluate.py --rules NAME).
+# Other paths, e.g. the Masters path, need a longer board than the 19
+# squares gui.BOARD_COORDS lays out; pass them to Rules directly.
+VARIANTS = {
+    "default": DEFAULT_RULES,
+    "classic": Rules("classic", pieces=7),
+    "unsafe_rosettes": Rules("unsafe_rosettes", safe_squares=()),
+    "safe_rosettes": Rules("safe_rosettes", safe_squares=ROSETTES),
+    "classic_safe_rosettes": Rules("classic_safe_rosettes", pieces=7, safe_squares=ROSETTES),
+}
+
+
+def get_rules(name):
+    try:
+        return VARIANTS[name]
+    except KeyError:
+        raise ValueError(f"unknown rules variant {name!r}; choose from {sorted(VARIANTS)}")
@@ -0,0 +1,131 @@
+# ur/shared.py
+"""
+Fixed-size game state in shared memory.
+
+Worker processes attach to a block by name instead of receiving pickled
+UrGame objects: the parent writes positions into numbered slots, sends only
+slot numbers, and workers read them straight out of the buffer. Each slot
+is 2 + 2 * pieces signed bytes:
+
+    turn, winner (-1 while the game is on), player 0 steps..., player 1 steps...
+
+SharedResults is the matching write-back side: preallocated (move, value)
+slots that workers fill in and the parent reads after the tasks complete.
+
+The process that creates a block owns it and must unlink() it; attached
+processes only close() theirs.
+"""
+from array import array
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from ur.game import UrGame
+from ur.rules import get_rules
+
+
+def attach(name):
+    """
+    Open an existing block without registering it with the resource tracker,
+    which would otherwise unlink it (or warn) when this worker exits.
+    """
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedPositions:
+    def __init__(self, capacity, rules, shm=None):
+        self.capacity = capacity
+        self.rules = rules
+        self.pieces = rules.pieces
+        self.slot_size = 2 + 2 * self.pieces
+        self.owner = shm is None
+        self.shm = shm if shm is not None else SharedMemory(create=True, size=capacity * self.slot_size)
+        self.buf = self.shm.buf.cast("b")
+
+    def handle(self):
+        """Picklable description for attach()."""
+        return self.shm.name, self.capacity, self.rules.name
+
+    @classmethod
+    def attach(cls, handle):
+        name, capacity, rules_name = handle
+        return cls(capacity, get_rules(rules_name), attach(name))
+
+    def put(self, i, game):
+        n = self.pieces
+        o = i * self.slot_size
+        buf = self.buf
+        buf[o] = game.turn
+        buf[o + 1] = -1 if game.winner is None else game.winner
+        buf[o + 2:o + 2 + n] = array("b", game.pos[0])
+        buf[o + 2 + n:o + 2 + 2 * n] = array("b", game.pos[1])
+
+    def get(self, i):
+        n = self.pieces
+        o = i * self.slot_size
+        buf = self.buf
+        game = UrGame.__new__(UrGame)
+        game.rules = self.rules
+        game.turn = buf[o]
+        game.winner = None if buf[o + 1] < 0 else buf[o + 1]
+        game.pos = [buf[o + 2:o + 2 + n].tolist(), buf[o + 2 + n:o + 2 + 2 * n].tolist()]
+        return game
+
+    def close(self):
+        self.buf.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedResults:
+    """capacity slots of (move: i64, value: f64) plus a done flag each."""
+
+    def __init__(self, capacity, shm=None):
+        self.capacity = capacity
+        self.owner = shm is None
+        self.shm = shm if shm is not None else SharedMemory(create=True, size=17 * capacity)
+        raw = self.shm.buf
+        self.moves = raw[:8 * capacity].cast("q")
+        self.values = raw[8 * capacity:16 * capacity].cast("d")
+        self.done = raw[16 * capacity:17 * capacity]
+
+    def handle(self):
+        return self.shm.name, self.capacity
+
+    @classmethod
+    def attach(cls, handle):
+        name, capacity = handle
+        return cls(capacity, attach(name))
+
+    def put(self, i, move, value):
+        self.moves[i] = move
+        self.values[i] = value
+        self.done[i] = 1
+
+    def get(self, i):
+        """(move, value), or None if slot i has not been written since reset()."""
+        if not self.done[i]:
+            return None
+        return self.moves[i], self.values[i]
+
+    def reset(self, n=None):
+        n = self.capacity if n is None else n
+        self.done[:n] = bytes(n)
+
+    def close(self):
+        for view in (self.moves, self.values, self.done):
+            view.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        if self.owner:
+            self.shm.unlink()